@@ -1,5 +1,8 @@
 # API wrapper for Rez
 
+import pickle
+import multiprocessing
+
 from rez.resolved_context import ResolvedContext as env
 from rez.packages_ import iter_packages as find
 from rez.package_copy import copy_package
@@ -9,6 +12,7 @@ from rez.packages_ import Package
 from rez.utils.formatting import PackageRequest
 from rez.system import system
 from rez.config import config
+from rez.shells import create_shell
 from rez.util import which
 from rez import __version__ as version
 from rez.exceptions import (
@@ -30,6 +34,65 @@ def clear_caches():
         repo.clear_caches()
 
 
+def can_spawn_shell(shell):
+    """Return whether `shell` may source code generated ahead of time
+
+    Shell plug-ins of all flavours of Rez spawn shells, but not all of
+    them expose it. Launch via ResolvedContext.execute_shell otherwise.
+
+    """
+
+    return callable(getattr(create_shell(shell), "spawn_shell", None))
+
+
+def shell_code(context, shell, parent_environ, context_file, rxt_file):
+    """Generate code applying `context` as ResolvedContext.execute_shell does
+
+    Arguments:
+        context (ResolvedContext): Context to interpret
+        shell (str): Name of shell, e.g. "bash"
+        parent_environ (dict): Environment onto which to apply the context
+        context_file (str): Where the code will be written
+        rxt_file (str): Where the context has been saved
+
+    Returns:
+        str: Native shell code
+
+    """
+
+    # Set ahead of the context, such that a package may still override it
+    sh = create_shell(shell)
+    sh.setenv("REZ_RXT_FILE", rxt_file)
+    sh.setenv("REZ_CONTEXT_FILE", context_file)
+
+    return "\n".join([
+        sh.get_output(),
+        context.get_shell_code(shell=shell, parent_environ=parent_environ),
+    ])
+
+
+def spawn_shell(context, context_file, shell, command, parent_environ,
+                **Popen_args):
+    """Run `command` in `shell`, sourcing previously generated `context_file`
+
+    Equivalent to ResolvedContext.execute_shell, minus generating the code.
+    See can_spawn_shell() for whether `shell` supports this.
+
+    Returns:
+        subprocess.Popen
+
+    """
+
+    sh = create_shell(shell)
+    tmpdir = context.tmpdir_manager.mkdtemp()
+
+    return sh.spawn_shell(context_file,
+                          tmpdir,
+                          command=command,
+                          env=parent_environ,
+                          **Popen_args)
+
+
 def find_one(name, range_=None, paths=None, package_filter=None):
     """
     Find next package version
@@ -69,15 +132,165 @@ def find_latest(name, range_=None, paths=None, package_filter=None):
     else:
         it = find(name, range_, paths)
 
-    it = sorted(it, key=lambda pkg: pkg.version)
+    # Single pass, with the later of equal versions taking precedence
+    latest = None
+    for pkg in it:
+        if latest is None or pkg.version >= latest.version:
+            latest = pkg
 
-    try:
-        return list(it)[-1]
-    except IndexError:
+    if latest is None:
         raise PackageNotFoundError(
             "package family not found: %s" % name
         )
 
+    return latest
+
+
+def resolve_many(base,
+                 requests,
+                 package_paths=None,
+                 package_filter=None,
+                 base_context=None,
+                 pool=None):
+    """Resolve `base` once, and each of `requests` on top of it
+
+    Each request is solved in full, together with `base`. Pinning the
+    resolved packages of `base` would save the solver some work, but
+    may settle on other versions than a full solve would, and would
+    leave a context reporting pins rather than what was requested.
+    What is shared is the solve of `base` itself, along with package
+    listings cached by the repositories of this process, such that the
+    saving is the time it took to solve `base`, when reused.
+
+    Arguments:
+        base (list): Request shared by all, e.g. ["profile-1.0"]
+        requests (list): Requests added to `base`, e.g. [["maya==2020"]]
+        package_paths (list, optional): As per ResolvedContext
+        package_filter (PackageFilterList, optional): As per ResolvedContext
+        base_context (ResolvedContext, optional): Previous solve of `base`
+        pool (ResolvePool, optional): Solve in worker processes
+
+    Returns:
+        tuple: Context of `base`, a context or exception per request and
+            statistics, e.g. {"resolves": 3, "baseReused": True,
+            "savedTime": 0.25}
+
+    """
+
+    kwargs = {
+        "package_paths": package_paths,
+        "package_filter": package_filter,
+    }
+
+    stats = {
+        "resolves": len(requests),
+        "baseReused": True,
+        "savedTime": 0.0,
+    }
+
+    if base_context is None:
+        base_context = env(base, **kwargs)
+        stats["baseReused"] = False
+    else:
+        stats["savedTime"] = getattr(base_context, "solve_time", 0.0)
+
+    full_requests = [list(base) + list(request) for request in requests]
+
+    if pool is not None:
+        return base_context, pool.env_many(full_requests, **kwargs), stats
+
+    contexts = []
+    for request in full_requests:
+        try:
+            contexts.append(env(request, **kwargs))
+        except Exception as e:
+            contexts.append(e)
+
+    return base_context, contexts, stats
+
+
+def _warm_worker():
+    """Pay the cost of importing the solver once per worker"""
+    import rez.solver  # noqa
+
+
+def _resolve_worker(args):
+    """Resolve a request in a worker process, see ResolvePool"""
+    request, package_paths, package_filter = args
+
+    try:
+        if package_filter is not None:
+            package_filter = PackageFilterList.from_pod(package_filter)
+
+        context = env(request,
+                      package_paths=package_paths,
+                      package_filter=package_filter)
+
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = ResolvedContextError("%s: %s" % (type(e).__name__, e))
+
+        return None, e
+
+    return context.to_dict(), None
+
+
+class ResolvePool(object):
+    """Resolve in worker processes, making use of all cores
+
+    The solver is pure Python and bound by the GIL, so threads will
+    only ever make use of one core. Contexts are instead resolved by
+    worker processes and passed back serialised. Workers are kept
+    alive for the lifetime of the pool, such that importing Rez
+    and reading packages is paid for once.
+
+    Arguments:
+        processes (int): Number of worker processes
+
+    """
+
+    def __init__(self, processes):
+        try:
+            # Forking a process running Qt threads is unsafe
+            context = multiprocessing.get_context("spawn")
+        except AttributeError:
+            # Python 2
+            context = multiprocessing
+
+        self._pool = context.Pool(processes, initializer=_warm_worker)
+        self.processes = processes
+
+    def env_many(self, requests, package_paths=None, package_filter=None):
+        """Resolve each of `requests` in parallel
+
+        Returns:
+            list: Context, or exception on failure, per request
+
+        """
+
+        if package_filter is not None:
+            package_filter = package_filter.to_pod()
+
+        results = self._pool.map(_resolve_worker, [
+            (list(map(str, request)), package_paths, package_filter)
+            for request in requests
+        ])
+
+        contexts = []
+        for data, error in results:
+            if error is not None:
+                contexts.append(error)
+            else:
+                contexts.append(env.from_dict(data))
+
+        return contexts
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
 
 try:
     from rez import __project__ as project
@@ -91,10 +304,16 @@ __all__ = [
     "find",
     "find_one",
     "find_latest",
+    "resolve_many",
+    "ResolvePool",
     "config",
     "version",
     "project",
     "copy_package",
+    "create_shell",
+    "can_spawn_shell",
+    "shell_code",
+    "spawn_shell",
     "package_repository_manager",
     "system",
 
@@ -24,6 +24,33 @@ exclude_filter = "*.beta"
 # Where to go when clicking the logo
 help_url = "https://allzpark.com"
 
+# Resolve favorite profiles in the background, once the user
+# has been idle for this many seconds. 0 disables pre-warming.
+prewarm_idle = 3.0
+
+# Resolve applications listed before being resolved, when resolving
+# on demand, once the user has been idle for this many seconds.
+# 0 leaves them to be resolved once selected or hovered.
+resolve_idle = 1.0
+
+# Resolve applications in this many worker processes, making use of
+# more than one core. -1 uses one per core, 0 resolves in-process.
+resolve_processes = 0
+
+# Seconds to remember failed resolves and missing packages for,
+# rather than failing again on every change of profile.
+failure_ttl = 120
+
+# Log what the GUI is doing when it stops responding for longer
+# than this many seconds. 0 disables the watchdog.
+stall_threshold = 1.0
+
+# Sample the stacks of all threads this many times per second,
+# for export as a flamegraph from the Diagnostics dock. Sampling
+# may also be started from there, or with ALLZPARK_SAMPLING=1
+sampling = False
+sample_rate = 100
+
 
 def profiles():
     """Return list of profiles
@@ -110,9 +137,11 @@ def protected_preferences():
 
     Following is a list of preference names that you may lock:
     * showAllApps (bool)
+    * resolveOnDemand (bool)
     * showHiddenApps (bool)
     * showAllVersions (bool)
     * patchWithFilter (bool)
+    * memoryProfiling (bool)
     * clearCacheTimeout (int)
     * exclusionFilter (str)
 
@@ -368,6 +368,9 @@ def main():
         "Do not load custom allzparkconfig.py"))
     parser.add_argument("--demo", action="store_true", help=(
         "Run demo material"))
+    parser.add_argument("--profile-ops", action="store_true", help=(
+        "Write a cProfile .pstats file per reset, change of profile, "
+        "selection of application, patch and launch"))
     parser.add_argument("--root", help=(
         "(DEPRECATED) Path to where profiles live on disk, "
         "defaults to allzparkconfig.profiles"))
@@ -425,7 +428,16 @@ def main():
     else:
         profiles = []
 
+    if opts.profile_ops:
+        ctrl.profile_operations(True)
+
     launch(ctrl)
     reset(ctrl, profiles)
 
+    # Report on anything keeping the GUI from responding
+    ctrl.watchdog.start()
+
+    if allzparkconfig.sampling or os.getenv("ALLZPARK_SAMPLING"):
+        ctrl.sampler.start()
+
     app.exec_()
@@ -6,17 +6,23 @@ import time
 import json
 import errno
 import shutil
+import getpass
+import atexit
+import hashlib
 import logging
 import tempfile
 import threading
 import traceback
+import functools
 import subprocess
+import multiprocessing
+import multiprocessing.pool
 
 from collections import OrderedDict as odict
 
-from .vendor.Qt import QtCore, QtGui
+from .vendor.Qt import QtCore
 from .vendor import transitions
-from . import model, util, allzparkconfig
+from . import model, util, diagnostics, allzparkconfig, resources as res
 
 # Third-party dependencies
 from . import _rezapi as rez
@@ -32,6 +38,100 @@ log = logging.getLogger(__name__)
 Latest = model.Latest  # Enum
 NoVersion = model.NoVersion
 
+# Number of applications remembered by launch history
+MaxLaunchHistory = 50
+
+# Number of rendered graphs kept on disk
+MaxCachedGraphs = 50
+
+# Number of contexts whose shell code is kept on disk
+MaxCachedShells = 50
+
+# Seconds between progress updates whilst localising
+LocalizeInterval = 0.5
+
+# Number of requests whose contexts are kept in the resolve cache
+MaxResolveCache = 200
+
+
+def context_digest(context):
+    """Return a digest identifying what was requested and resolved
+
+    Contexts resolving to the same packages share a digest, and
+    can share anything derived from them, such as a graph.
+
+    """
+
+    lines = [" ".join(str(req) for req in context.requested_packages())]
+
+    if context.success:
+        lines += [
+            "%s %s" % (pkg.qualified_name, getattr(pkg, "uri", ""))
+            for pkg in context.resolved_packages or []
+        ]
+    else:
+        lines += [str(getattr(context, "failure_description", ""))]
+
+    data = "\n".join(lines)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def environ_digest(environ):
+    """Return a digest identifying the contents of `environ`"""
+    data = json.dumps(sorted(environ.items()))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def cache_dir(*paths):
+    """Return directory for on-disk caches, created on first use"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        # Not all environments provide a user
+        user = "default"
+
+    path = os.path.join(tempfile.gettempdir(), "allzpark-%s" % user, *paths)
+
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    return path
+
+
+def evict_cache(path, keep):
+    """Remove all but the `keep` most recently modified entries of `path`
+
+    Returns:
+        list: Names of entries removed
+
+    """
+
+    entries = []
+    for name in os.listdir(path):
+        try:
+            entries.append((os.path.getmtime(os.path.join(path, name)), name))
+        except OSError:
+            continue  # Removed in the meantime
+
+    removed = []
+    for _, name in sorted(entries, reverse=True)[keep:]:
+        fname = os.path.join(path, name)
+
+        try:
+            if os.path.isdir(fname):
+                shutil.rmtree(fname)
+            else:
+                os.remove(fname)
+        except OSError:
+            continue  # In use or removed in the meantime
+
+        removed.append(name)
+
+    return removed
+
 
 class State(dict):
     """Transient, persistent and machine for state
@@ -74,7 +174,35 @@ class State(dict):
             # Cache environment testing result
             "testedEnvirons": {},
 
+            # Cache of available versions per package family
+            "rezVersions": {},
+
+            # Generated shell code per context, environment and shell
+            "shellScripts": {},
+
+            # Resolved contexts per request, across profiles,
+            # least recently used first
+            "resolveCache": odict(),
+
+            # Unfiltered packages per family and package path
+            "rezCandidates": {},
+
+            # Failed contexts and lookups, with time of failure
+            "rezFailures": {},
+
             "rezApps": odict(),
+
+            # Package and unpatched context per app, for patching
+            "appSources": odict(),
+
+            # Available versions per app
+            "appRanges": {},
+
+            # Apps yet to be resolved, and what to resolve them with
+            "unresolvedApps": odict(),
+            "prefetching": set(),
+            "profileRequest": [],
+
             "fullCommand": "rez env",
             "serialisationMode": (
                 storage.value("serialisationMode") or "used_request"
@@ -180,6 +308,115 @@ class _Stream(object):
         return
 
 
+class InputMonitor(QtCore.QObject):
+    """Keep track of when the user last interacted with the application
+
+    A single event filter of the application, shared by each Prewarmer.
+
+    """
+
+    InputEvents = (
+        QtCore.QEvent.MouseButtonPress,
+        QtCore.QEvent.KeyPress,
+        QtCore.QEvent.Wheel,
+    )
+
+    def __init__(self, parent=None):
+        super(InputMonitor, self).__init__(parent)
+
+        self.last_input = time.time()
+
+        app = QtCore.QCoreApplication.instance()
+        if app is not None:
+            app.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.InputEvents:
+            self.last_input = time.time()
+
+        return False
+
+
+class Prewarmer(QtCore.QObject):
+    """Resolve in the background while the user is idle
+
+    Tasks, such as resolving favorite profiles, are run one at a time
+    on a background thread, which pauses whenever the user has recently
+    interacted with the application or the controller is busy, leaving
+    the solver to whatever the user asked for.
+
+    Arguments:
+        ctrl (Controller): Where to resolve
+        monitor (InputMonitor): When the user last interacted
+        idle (float): Seconds without user input before resolving
+
+    """
+
+    def __init__(self, ctrl, monitor, idle=3.0, parent=None):
+        super(Prewarmer, self).__init__(parent)
+
+        self._ctrl = ctrl
+        self._monitor = monitor
+        self._idle = idle
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, tasks):
+        """Run `tasks` in the background, once idle
+
+        Arguments:
+            tasks (list): Pairs of label and callable, the callable
+                taking a `wait` argument to call in between resolves.
+
+        """
+
+        if not (self._idle and tasks and util.USE_THREADING):
+            return
+
+        self.stop()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(list(tasks),
+                                              self._stopped))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop resolving, leaving what has been resolved so far"""
+        self._stopped.set()
+
+    def wait(self, stopped):
+        """Block until idle, return False if `stopped` meanwhile"""
+        while not stopped.is_set():
+            idle = time.time() - self._monitor.last_input > self._idle
+
+            if idle and self._ctrl.state.state == "ready":
+                return True
+
+            stopped.wait(0.5)
+
+        return False
+
+    def _run(self, tasks, stopped):
+        for label, task in tasks:
+            if not self.wait(stopped):
+                break
+
+            self._ctrl.debug("Pre-warming %s.." % label)
+
+            try:
+                with util.timing() as t:
+                    task(wait=lambda: self.wait(stopped))
+
+            except Exception as e:
+                # Never mind, it'll be resolved if selected
+                self._ctrl.debug("Pre-warming %s failed: %s" % (label, e))
+
+            else:
+                self._ctrl.debug("Pre-warmed %s in %.2f seconds" % (
+                    label, t.duration))
+
+
 class Controller(QtCore.QObject):
     state_changed = QtCore.Signal(_State)
     logged = QtCore.Signal(str, int)  # message, level
@@ -193,11 +430,23 @@ class Controller(QtCore.QObject):
 
     application_changed = QtCore.Signal()
 
+    # An app listed before being resolved has been resolved
+    application_resolved = QtCore.Signal(str)  # app request
+
     # The current command to launch an application has changed
     command_changed = QtCore.Signal(str)  # command
 
     patch_changed = QtCore.Signal(str)  # full patch string
 
+    # A graph has finished rendering, empty if GraphViz was not found
+    graph_rendered = QtCore.Signal(str)  # path to image
+
+    # A graph failed to render for any other reason
+    graph_failed = QtCore.Signal()
+
+    # Emitted as packages are localised
+    localize_progressed = QtCore.Signal(int, int, float)  # done, total, mb
+
     running_cmd_updated = QtCore.Signal(int)
 
     states = [
@@ -248,6 +497,12 @@ class Controller(QtCore.QObject):
         timers["commandsPoller"].timeout.connect(self.on_tasks_polled)
         timers["commandsPoller"].start(500)
 
+        # Icons are kept across profile changes, until packages change
+        self.repository_changed.connect(res.icon_cache().clear)
+        self.repository_changed.connect(
+            lambda: self._state["rezFailures"].clear())
+        self.application_resolved.connect(self.on_application_resolved)
+
         models["parentenv"].load(state["parentEnviron"].copy())
 
         # Initialize the state machine
@@ -265,11 +520,30 @@ class Controller(QtCore.QObject):
         self._models = models
         self._storage = storage
         self._state = state
+        self._shell_lock = threading.Lock()
+        self._apps_lock = threading.Lock()
+        self._generation = 0
+        self._resolve_pool = None
+        self._lookup_pool = None
+        self._input = InputMonitor()
+        self._prewarmer = Prewarmer(self, self._input,
+                                    allzparkconfig.prewarm_idle)
+        self._resolver = Prewarmer(self, self._input,
+                                   allzparkconfig.resolve_idle)
+        self._speculating = threading.Event()
+        self._memory = diagnostics.MemoryProfiler()
+        self._watchdog = diagnostics.Watchdog(
+            allzparkconfig.stall_threshold, parent=self)
+        self._sampler = diagnostics.Sampler(allzparkconfig.sample_rate)
         self._name_to_state = {
             state.name: state
             for state in self.states
         }
 
+        if os.getenv("ALLZPARK_TRACEMALLOC") or \
+                state.retrieve("memoryProfiling"):
+            self._memory.start()
+
         state.on_enter_booting()
 
     # ----------------
@@ -288,6 +562,25 @@ class Controller(QtCore.QObject):
     def state(self):
         return self._state
 
+    @property
+    def memory(self):
+        return self._memory
+
+    @property
+    def watchdog(self):
+        return self._watchdog
+
+    @property
+    def sampler(self):
+        return self._sampler
+
+    def profile_operations(self, enabled=True):
+        """Write a cProfile of each reset, change of profile and so on"""
+        if enabled:
+            diagnostics.ops.start(cache_dir("profiles"))
+        else:
+            diagnostics.ops.stop()
+
     @property
     def current_error(self):
         return self._state["error"]
@@ -352,6 +645,18 @@ class Controller(QtCore.QObject):
             except rez.ResolvedContextError:
                 return model.BrokenContext.broken_dict.copy()
             else:
+                # Contexts of a profile share most of their environment
+                with util.timing() as t:
+                    environ = util.intern_environ(environ)
+
+                stats = util.intern_stats()
+                self.debug(
+                    "Interned environment of %s in %.3f seconds, "
+                    "%.1f kb shared across %d values so far" % (
+                        app_request, t.duration,
+                        stats["saved"] / 1024.0, stats["interned"])
+                )
+
                 env[app_request] = environ
                 return environ
 
@@ -367,7 +672,18 @@ class Controller(QtCore.QObject):
         app_vers = self._models["apps"].find(app_request)["versions"]
         app_names = {app.name for app in self._state["rezApps"].values()}
         profile_name = self._state["profileName"]
-        resolved = self._state["rezContexts"][app_request].resolved_packages
+        context = self._state["rezContexts"][app_request]
+
+        if isinstance(context, model.CompactContext):
+            # Listed in full, rather than by name and version only
+            context = context.rehydrate()
+
+        resolved = context.resolved_packages
+
+        all_versions = self.find_versions([
+            pkg.name for pkg in resolved or []
+            if pkg.name != profile_name and pkg.name not in app_names
+        ]) if all_vers else {}
 
         packages = odict()  # keep resolved order
         for pkg in resolved or []:
@@ -378,11 +694,10 @@ class Controller(QtCore.QObject):
                 versions = [str(pkg.version)]
             elif is_app:
                 versions = app_vers[:]
+            elif all_vers:
+                versions = all_versions[pkg.name][:]
             else:
-                versions = [
-                    str(p.version)
-                    for p in (self.find(pkg.name) if all_vers else [pkg])
-                ]
+                versions = [str(pkg.version)]
 
             packages[pkg.name] = {
                 "package": pkg,
@@ -514,25 +829,41 @@ class Controller(QtCore.QObject):
     def stdio(self, stream, level=logging.INFO):
         return _Stream(self, stream, level)
 
-    def find(self, family, range_=None):
+    def find(self, family, range_=None, paths=None, package_filter=None):
         """Find packages, relative Allzpark state
 
         Arguments:
             family (str): Name of package
             range_ (str): Range, e.g. "1" or "==0.3.13"
+            paths (list, optional): Package paths, defaults to current
+            package_filter (PackageFilterList, optional): Defaults
+                to current
 
         """
 
-        package_filter = self._package_filter()
-        paths = self._package_paths()
+        if package_filter is None:
+            package_filter = self._package_filter()
+
+        if paths is None:
+            paths = self._package_paths()
+
+        # Missing packages are slow to find missing, e.g. on NFS
+        key = ("find", family, str(range_ or ""), tuple(paths))
+        if self._failure(key) is not None:
+            return
+
         it = rez.find(family, range_, paths=paths)
         it = sorted(
             it,
 
             # Make e.g. 1.10 appear after 1.9
-            key=lambda p: util.natural_keys(str(p.version))
+            key=lambda p: p.version
         )
 
+        if not it:
+            self._remember_failure(key, rez.PackageNotFoundError(
+                "package not found: %s" % family))
+
         for pkg in it:
             if package_filter.excludes(pkg):
                 self.debug("Excluding %s==%s.." % (pkg.name, pkg.version))
@@ -540,6 +871,46 @@ class Controller(QtCore.QObject):
 
             yield pkg
 
+    def find_versions(self, families):
+        """Find versions of many package families at once
+
+        Families are looked up in parallel, as each lookup is mostly
+        spent waiting on the filesystem, and results are cached per
+        family until the next reset.
+
+        Arguments:
+            families (list): Names of packages
+
+        Returns:
+            dict: Versions as strings, ordered as by `find`, per family
+
+        """
+
+        # Versions depend on package paths and filters
+        settings = self._resolve_settings()
+        cache = self._state["rezVersions"].setdefault(settings, {})
+        missing = [family for family in set(families) if family not in cache]
+
+        # Read preferences here, rather than from each lookup thread
+        paths = self._package_paths()
+        package_filter = self._package_filter()
+
+        def _find(family):
+            return family, [
+                str(pkg.version) for pkg in
+                self.find(family, paths=paths, package_filter=package_filter)
+            ]
+
+        if len(missing) > 1 and util.USE_THREADING:
+            found = self.lookup_pool().map(_find, missing)
+        else:
+            found = map(_find, missing)
+
+        for family, versions in found:
+            cache[family] = versions
+
+        return {family: cache[family] for family in families}
+
     def env(self, requests, use_filter=True):
         """Resolve context, relative Allzpark state
 
@@ -551,14 +922,440 @@ class Controller(QtCore.QObject):
 
         """
 
+        key = (tuple(str(request) for request in requests), use_filter)
+        context = self._cached_context(key)
+
+        if isinstance(context, Exception):
+            raise context
+
+        if context is not None:
+            return context
+
+        # Cached relative what it was resolved with, should
+        # preferences change whilst resolving
+        generation = self._generation
+        package_filter = (self._package_filter() if use_filter
+                          else rez.PackageFilterList.singleton)
+        paths = self._package_paths()
+
+        try:
+            context = rez.env(
+                requests,
+                package_paths=paths,
+                package_filter=package_filter if use_filter else None
+            )
+
+        except rez.RezError as e:
+            self._cache_context(key, e, generation, paths, package_filter)
+            raise
+
+        context = self._compact(context)
+        self._cache_context(key, context, generation, paths, package_filter)
+
+        return context
+
+    def env_many(self, base, requests):
+        """Resolve `base` once, and each of `requests` on top of it
+
+        Like `env`, but with `base` solved once and cached, such that
+        a profile failing to resolve is known up-front and each request
+        is solved in parallel where possible. See `rez.resolve_many`.
+
+        Arguments:
+            base (list): Request shared by all, e.g. ["profile-1.0"]
+            requests (list): Requests added to `base`
+
+        Returns:
+            list: Context, or exception on failure, per request
+
+        """
+
+        def key(request):
+            return tuple(str(req) for req in request), True
+
+        results = [self._cached_context(key(list(base) + list(request)))
+                   for request in requests]
+        missing = [request for request, result in zip(requests, results)
+                   if result is None]
+
+        base_context = self._cached_context(key(base))
+        if isinstance(base_context, Exception):
+            raise base_context
+
+        if base_context is not None and not missing:
+            return results
+
+        generation = self._generation
         package_filter = self._package_filter()
         paths = self._package_paths()
 
-        return rez.env(
-            requests,
-            package_paths=paths,
-            package_filter=package_filter if use_filter else None
-        )
+        with util.timing() as t:
+            base_context, contexts, stats = rez.resolve_many(
+                base,
+                missing,
+                package_paths=paths,
+                package_filter=package_filter,
+                base_context=base_context,
+                pool=self.resolve_pool() if len(missing) > 1 else None,
+            )
+
+        self.debug("Resolved %d requests on top of %s in %.2f seconds%s" % (
+            stats["resolves"], " ".join(base), t.duration,
+            ", reusing its resolve of %.2f seconds" % stats["savedTime"]
+            if stats["baseReused"] else ""))
+
+        base_context = self._compact(base_context)
+        contexts = [self._compact(context) for context in contexts]
+        self._cache_context(key(base), base_context, generation,
+                            paths, package_filter)
+
+        for request, context in zip(missing, contexts):
+            if isinstance(context, Exception) and \
+                    not isinstance(context, rez.RezError):
+                continue
+
+            self._cache_context(key(list(base) + list(request)),
+                                context,
+                                generation,
+                                paths,
+                                package_filter)
+
+        contexts = iter(contexts)
+        return [next(contexts) if result is None else result
+                for result in results]
+
+    def _compact(self, context):
+        """Keep successful `context` compressed until needed
+
+        Failures are left as-is, they are small and short-lived.
+
+        """
+
+        if isinstance(context, (Exception, model.CompactContext)) or \
+                not context.success:
+            return context
+
+        return model.CompactContext(context)
+
+    def context_stats(self):
+        """Return memory held by the context of each application
+
+        Returns:
+            dict: {app_request: {"bytes": int, "hydrated": bool}}
+
+        """
+
+        with self._apps_lock:
+            contexts = list(self._state["rezContexts"].items())
+
+        stats = {}
+        for app_request, context in contexts:
+            if not isinstance(context, model.CompactContext):
+                continue
+
+            stats[app_request] = {
+                "bytes": context.nbytes,
+                "hydrated": context.hydrated,
+            }
+
+        return stats
+
+    def candidates(self, family, use_filter=True, paths=None,
+                   package_filter=None):
+        """Return packages of `family` visible to the solver
+
+        Packages are listed once per family and package path, and
+        filtered on every call, such that changing which paths or
+        filter to use does not involve the filesystem.
+
+        Arguments:
+            family (str): Name of package
+            use_filter (bool, optional): Whether to apply the current
+                package filter, unless `package_filter` is given
+            paths (list, optional): Package paths, defaults to current
+            package_filter (PackageFilterList, optional): Filter to
+                apply, defaults to current
+
+        Returns:
+            tuple: URIs of packages
+
+        """
+
+        if package_filter is None:
+            package_filter = (self._package_filter() if use_filter
+                              else rez.PackageFilterList.singleton)
+
+        if paths is None:
+            paths = self._package_paths()
+
+        listed = self._state["rezCandidates"]
+        candidates = []
+
+        for path in paths:
+            try:
+                packages = listed[(family, path)]
+            except KeyError:
+                packages = list(rez.find(family, paths=[path]))
+                listed[(family, path)] = packages
+
+            candidates.extend(
+                pkg.uri for pkg in packages
+                if not package_filter.excludes(pkg)
+            )
+
+        return tuple(candidates)
+
+    def _resolve_settings(self, use_filter=True, paths=None,
+                          package_filter=None):
+        """Return what, other than packages, determines a resolve
+
+        Relative current preferences, unless `paths` and
+        `package_filter` are given.
+
+        """
+
+        if package_filter is None:
+            package_filter = (self._package_filter() if use_filter
+                              else rez.PackageFilterList.singleton)
+
+        if paths is None:
+            paths = self._package_paths()
+
+        return tuple(paths), repr(package_filter.to_pod())
+
+    def _cached_context(self, key):
+        """Return context resolved from `key`, if still valid, else None
+
+        A context remains valid across changes to package paths and
+        filters for as long as the packages available to each family it
+        depends on remain the same, such that flipping a preference only
+        re-resolves what it affects. See `_dependencies`.
+
+        """
+
+        cache = self._state["resolveCache"]
+        use_filter = key[1]
+        settings = self._resolve_settings(use_filter)
+
+        failure = self._failure((key, settings))
+        if failure is not None:
+            return failure
+
+        entries = cache.pop(key, None)
+        if entries is None:
+            return None
+
+        # Most recently used
+        cache[key] = entries
+
+        for entry_settings, _, context in entries:
+            if entry_settings == settings:
+                return context
+
+        for _, signature, context in entries:
+            if all(self.candidates(family, use_filter) == candidates
+                   for family, candidates in signature.items()):
+                entries.append((settings, signature, context))
+                return context
+
+        return None
+
+    def _cache_context(self, key, context, generation, paths,
+                       package_filter):
+        """Cache `context` of `key`, as resolved with `paths` and filter
+
+        Only the most recently used requests are kept, see
+        MaxResolveCache.
+
+        """
+
+        # Results from before a reset are outdated
+        if generation != self._generation:
+            return
+
+        settings = self._resolve_settings(key[1], paths, package_filter)
+
+        # Failures carry no record of what they depend on,
+        # and are kept for a short while only
+        if isinstance(context, Exception) or not context.success:
+            return self._remember_failure((key, settings), context)
+
+        signature = {
+            family: self.candidates(family, key[1], paths, package_filter)
+            for family in self._dependencies(context)
+        }
+
+        cache = self._state["resolveCache"]
+        entries = cache.pop(key, [])
+        entries.append((settings, signature, context))
+        cache[key] = entries
+
+        while len(cache) > MaxResolveCache:
+            cache.pop(next(iter(cache)), None)
+
+    def _dependencies(self, context):
+        """Return families the resolve of `context` depends on
+
+        Not only its resolved families, but those required by any
+        variant of its resolved packages, such that which variant to
+        choose is considered anew once a family required by another
+        variant changes, e.g. with development packages.
+
+        """
+
+        if isinstance(context, model.CompactContext):
+            # Only its requested packages are kept in full
+            context = context.rehydrate()
+
+        families = set()
+
+        for variant in context.resolved_packages:
+            package = variant.parent
+            families.add(variant.name)
+            families.update(req.name for req in package.requires or [])
+
+            for requires in package.variants or []:
+                families.update(req.name for req in requires)
+
+        return families
+
+    def _failure(self, key):
+        """Return failure remembered for `key`, unless expired"""
+        failures = self._state["rezFailures"]
+
+        try:
+            failure, timestamp = failures[key]
+        except KeyError:
+            return None
+
+        if time.time() - timestamp > allzparkconfig.failure_ttl:
+            failures.pop(key, None)
+            return None
+
+        return failure
+
+    def _remember_failure(self, key, failure):
+        """Remember failed context or exception of `key` for a while"""
+        self._state["rezFailures"][key] = (failure, time.time())
+
+    def lookup_pool(self):
+        """Return threads to look up packages with
+
+        Threads are started on first use and kept until Allzpark exits.
+
+        """
+
+        if self._lookup_pool is None:
+            self._lookup_pool = multiprocessing.pool.ThreadPool(8)
+
+            def close(pool=self._lookup_pool):
+                pool.close()
+                pool.join()
+
+            atexit.register(close)
+
+        return self._lookup_pool
+
+    def resolve_pool(self):
+        """Return worker processes to resolve with, if enabled
+
+        Workers are started on first use and kept alive across profiles
+        and resets, until Allzpark exits.
+
+        """
+
+        processes = allzparkconfig.resolve_processes
+
+        if not processes:
+            return None
+
+        if self._resolve_pool is None:
+            if processes < 0:
+                processes = multiprocessing.cpu_count()
+
+            self.debug("Starting %d resolve processes.." % processes)
+            self._resolve_pool = rez.ResolvePool(processes)
+            atexit.register(self._resolve_pool.close)
+
+        return self._resolve_pool
+
+    def prewarm(self, profile, wait=lambda: True):
+        """Resolve contexts of `profile` into the resolve cache
+
+        Only the applications provided by the profile itself are resolved,
+        such that subsequently selecting it skips the solver.
+
+        Arguments:
+            profile (Package): Profile to resolve
+            wait (callable, optional): Called before each resolve,
+                returning False to stop
+
+        """
+
+        profile_variant = next(profile.iter_variants())
+        qualified_profile_name = profile_variant.qualified_package_name
+
+        for app_request in allzparkconfig.applications_from_package(profile):
+            if not wait():
+                return
+
+            req = rez.PackageRequest(app_request.strip("~"))
+            app_package = list(self.find(req.name, range_=req.range))[-1]
+            app_request = "%s==%s" % (app_package.name, app_package.version)
+            self.env_many([qualified_profile_name], [[app_request]])
+
+    def prefetch_profile(self, profile_name, version_name=Latest):
+        """Speculatively resolve apps of the profile the user points at
+
+        Apps are resolved in the background into the resolve cache,
+        until the user points elsewhere or anything else happens,
+        such that selecting the profile is likely to skip the solver.
+
+        Arguments:
+            profile_name (str): Name of profile, empty to cancel
+            version_name (str, optional): Version of profile
+
+        """
+
+        # Cancel previous, as the user has moved on
+        self._speculating.set()
+
+        if not util.USE_THREADING:
+            return
+
+        try:
+            profile = self._state["rezProfiles"][profile_name][version_name]
+        except KeyError:
+            # Not a profile, e.g. a group of profiles
+            return
+
+        if isinstance(profile, model.BrokenPackage):
+            return
+
+        stopped = threading.Event()
+
+        def wait():
+            return not stopped.is_set() and self._state.state == "ready"
+
+        def do():
+            with util.timing() as t:
+                self.prewarm(profile, wait=wait)
+
+            self.debug("Prefetched %s in %.2f seconds%s" % (
+                profile_name, t.duration,
+                " (cancelled)" if stopped.is_set() else ""))
+
+        def run():
+            try:
+                do()
+            except Exception as e:
+                # Never mind, it'll be resolved if selected
+                self.debug("Prefetching %s failed: %s" % (profile_name, e))
+
+        self._speculating = stopped
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
 
     def update_command(self, mode=None):
         if mode:
@@ -620,7 +1417,8 @@ class Controller(QtCore.QObject):
         return package_filter
 
     @util.async_
-    def reset(self, root=None, on_success=lambda: None):
+    @diagnostics.profiled
+    def reset(self, root=None, on_success=lambda: None, clear_caches=True):
         """Initialise controller with `root`
 
         Profiles are listed at `root` and matched
@@ -630,6 +1428,9 @@ class Controller(QtCore.QObject):
             root (list, callable): A list of profile names, or a callable
                 returning names of profiles.
             on_success (callable): Callback on reset completed.
+            clear_caches (bool, optional): Whether packages on disk
+                may have changed, or only preferences. Resolves and
+                package listings are kept for the latter.
 
         """
 
@@ -700,49 +1501,172 @@ class Controller(QtCore.QObject):
             else:
                 self.select_profile(profile)
 
+            self._prewarmer.start([
+                (name, functools.partial(
+                    self.prewarm, self._state["rezProfiles"][name][Latest]))
+                for name in self._models["profiles"].favorites
+                if name in self._state["rezProfiles"]
+            ])
+
             on_success()
 
         def _on_failure(error, trace):
             raise error
 
+        self._prewarmer.stop()
+        self._resolver.stop()
+
         self._state["rezContexts"].clear()
         self._state["rezEnvirons"].clear()
+        self._state["shellScripts"].clear()
+        util.clear_interned()
         self._state["rezApps"].clear()
 
-        # Rez stores file listings and more
-        # in memory, in addition to memcached.
-        # This function clears the in-memory cache,
-        # so that we can pick up new packages.
-        rez.clear_caches()
+        if clear_caches:
+            self._generation += 1
+            self._state["rezVersions"].clear()
+            self._state["resolveCache"].clear()
+            self._state["rezCandidates"].clear()
+            self._state["rezFailures"].clear()
+
+            # Rez stores file listings and more
+            # in memory, in addition to memcached.
+            # This function clears the in-memory cache,
+            # so that we can pick up new packages.
+            rez.clear_caches()
+            model.clear_metadata()
 
         self._state.to_loading()
         util.defer(
-            do,
+            diagnostics.profiled(do, "reset.do"),
             on_success=_on_success,
             on_failure=_on_failure
         )
 
+    @diagnostics.profiled
     def patch(self, new):
         self.debug("Patching %s.." % new)
 
-        new = rez.PackageRequest(new)
-        old = odict(
-            (rez.PackageRequest(req).name, rez.PackageRequest(req))
-            for req in self._state.retrieve("patch", "").split()
-        )
+        new = rez.PackageRequest(new)
+        old = odict(
+            (rez.PackageRequest(req).name, rez.PackageRequest(req))
+            for req in self._state.retrieve("patch", "").split()
+        )
+
+        if new.name in old:
+            old.pop(new.name)
+
+        if str(new.range):
+            # Otherwise, let it return to the originally resolved value
+            old[new.name] = new
+
+        patch = " ".join(str(pkg) for pkg in old.values())
+        self._state.store("patch", patch)
+        self.patch_changed.emit(patch)
+
+        if not self._state["appSources"]:
+            # Nothing to patch, yet
+            return self.reset()
+
+        self._repatch(new.name)
+
+    @util.async_
+    def _repatch(self, family):
+        """Re-resolve only those contexts affected by patching `family`
+
+        Contexts including `family`, before or after the patch, are
+        patched anew from their unpatched context. Should no context
+        include it, it is being added and affects them all. The
+        remaining contexts, profiles and current app are kept as-is.
+
+        """
+
+        patch = self._state.retrieve("patch", "").split()
+        current_app = self._state["appRequest"] or ""
+        current_app = current_app.split("==", 1)[0]
+
+        with self._apps_lock:
+            sources = self._state["appSources"].copy()
+            contexts = self._state["rezContexts"].copy()
+
+        def names(context):
+            return set(pkg.name for pkg in context.resolved_packages or [])
+
+        def do():
+            adding = not any(
+                family in names(unpatched) or
+                family in names(contexts[app_request])
+                for app_request, (_, unpatched) in sources.items()
+            )
+
+            # Affected apps, by their request prior to patching
+            patched = dict()
+
+            with util.timing() as t:
+                for app_request, (app_package, unpatched) in sources.items():
+                    context = contexts[app_request]
+
+                    if not (adding or not context.success or (
+                            family in names(unpatched) or
+                            family in names(context))):
+                        continue
+
+                    self._state["rezEnvirons"].pop(app_request, None)
+                    self._state["testedEnvirons"].pop(app_request, None)
+
+                    patched[app_request] = self._patch_context(
+                        app_package,
+                        "%s==%s" % (app_package.name, app_package.version),
+                        unpatched,
+                        patch,
+                        current_app
+                    ) + ((app_package, unpatched),)
+
+            self.debug("Patched %d of %d contexts in %.2f seconds" % (
+                len(patched), len(sources), t.duration))
+
+            # Apps may have been resolved meanwhile, see _resolve_app,
+            # so merge into what is there now, keeping its order. Those
+            # are stored under the same lock, with the current patch.
+            merged_contexts = odict()
+            merged_sources = odict()
+
+            with self._apps_lock:
+                for app_request, context in self._state["rezContexts"].items():
+                    source = self._state["appSources"].get(app_request)
+
+                    if app_request in patched:
+                        app_request, context, source = patched[app_request]
+
+                    merged_contexts[app_request] = context
+                    if source is not None:
+                        merged_sources[app_request] = source
+
+                self._state["appSources"] = merged_sources
+                return self._associate_apps(merged_contexts)
 
-        if new.name in old:
-            old.pop(new.name)
+        def on_success(apps):
+            self._models["apps"].reset(apps)
+            self._state.to_ready()
 
-        if str(new.range):
-            # Otherwise, let it return to the originally resolved value
-            old[new.name] = new
+            # Patching may have changed the request of the current app
+            app_request = self._state.retrieve("startupApplication")
+            if app_request in self._state["rezContexts"]:
+                self.select_application(app_request)
 
-        patch = " ".join(str(pkg) for pkg in old.values())
-        self._state.store("patch", patch)
-        self.reset()
+        def on_failure(error, trace):
+            # Handled by on_unhandled_exception
+            raise error
+
+        self._state.to_loading()
+        util.defer(
+            diagnostics.profiled(do, "patch.do"),
+            on_success=on_success,
+            on_failure=on_failure
+        )
 
     @util.async_
+    @diagnostics.profiled
     def launch(self, **kwargs):
         def do():
             app_request = self._state["appRequest"]
@@ -789,6 +1713,7 @@ class Controller(QtCore.QObject):
                 disabled=disabled,
                 detached=is_detached,
                 environ=environ,
+                shell_script=self.shell_script,
                 parent=self
             )
 
@@ -802,35 +1727,100 @@ class Controller(QtCore.QObject):
             self._models["commands"].append(cmd)
 
             self._state.store("app/%s/lastUsed" % app_request, time.time())
+            self.record_launch(app_request)
             self._state.to_launching()
 
         self._state.to_loading()
-        util.delay(do)
+        util.delay(diagnostics.profiled(do, "launch.do"))
 
     def localize(self, name):
-        tempdir = tempfile.mkdtemp()
+        self.localize_all([name])
 
-        def do():
-            self.debug("Resolving %s.." % name)
-            variant = localz.resolve(name)[0]  # Guaranteed to be one
+    def localize_all(self, names):
+        """Localise many packages of the current context at once
 
-            try:
-                self.debug("Preparing %s.." % name)
-                copied = localz.prepare(variant, tempdir, verbose=2)[0]
+        Each variant of the context is localised by localz, in parallel,
+        as copies are mostly spent waiting on the network. Variants are
+        copied once, straight into the localised packages path, whose
+        size is emitted as it grows, and once more per package localised.
+
+        Arguments:
+            names (list): Names of packages in the current context
+
+        """
+
+        packages = self._models["packages"]
+        variants = {name: packages.find(name)["package"] for name in names}
+        path = localz.localized_packages_path()
+        progress = {"done": 0, "size": 0.0, "copying": {}}
+        lock = threading.Lock()
+
+        def _emit():
+            # Emitted whilst locked, such that progress never goes back
+            with lock:
+                done = progress["done"]
+                size = progress["size"] + sum(progress["copying"].values())
+                self.localize_progressed.emit(done, len(names), size)
+
+        def _size(root):
+            return (localz.dirsize(root) if os.path.isdir(root)
+                    else 0) / (10.0 ** 6)  # mb
+
+        def _watch(name, root, finished):
+            while not finished.wait(LocalizeInterval):
+                size = _size(root)
+
+                with lock:
+                    progress["copying"][name] = size
+
+                _emit()
 
-                self.debug("Computing size..")
-                size = localz.dirsize(tempdir) / (10.0 ** 6)  # mb
+        def _localize(name):
+            variant = variants[name]
+            root = os.path.join(path, variant.name, str(variant.version))
+            finished = threading.Event()
 
-                self.debug("Localising %.2f mb.." % size)
-                result = localz.localize(copied,
-                                         localz.localized_packages_path(),
-                                         verbose=2)
+            watcher = threading.Thread(target=_watch,
+                                       args=(name, root, finished))
+            watcher.daemon = True
+            watcher.start()
 
-                self.debug("Localised %s" % result)
+            try:
+                self.debug("Localising %s.." % name)
+                result = localz.localize(variant, path, verbose=2)
 
             finally:
-                self.debug("Cleaning up..")
-                shutil.rmtree(tempdir)
+                finished.set()
+                watcher.join()
+
+            size = _size(root)
+            self.debug("Localised %s, %.2f mb" % (result, size))
+
+            with lock:
+                progress["copying"].pop(name, None)
+                progress["done"] += 1
+                progress["size"] += size
+
+            _emit()
+
+        def do():
+            with util.timing() as t:
+                if len(names) > 1 and util.USE_THREADING:
+                    pool = multiprocessing.pool.ThreadPool(
+                        min(len(names), 4)
+                    )
+
+                    try:
+                        pool.map(_localize, names)
+                    finally:
+                        pool.close()
+
+                else:
+                    for name in names:
+                        _localize(name)
+
+            self.info("Localised %d packages, %.2f mb in %.2f seconds" % (
+                len(names), progress["size"], t.duration))
 
         def on_success(result=None):
             self.repository_changed.emit()
@@ -838,6 +1828,9 @@ class Controller(QtCore.QObject):
         def on_failure(error, trace):
             self.error(trace)
 
+            # Packages localised before the failure are still usable
+            self.repository_changed.emit()
+
         util.defer(do,
                    on_success=on_success,
                    on_failure=on_failure)
@@ -903,6 +1896,7 @@ class Controller(QtCore.QObject):
         return profiles
 
     @util.async_
+    @diagnostics.profiled
     def select_profile(self, profile_name, version_name=Latest):
 
         # Wipe existing data
@@ -913,10 +1907,16 @@ class Controller(QtCore.QObject):
         self._models["packages"].reset()
         self._models["profileVersions"].setStringList([])
 
-        self._state["rezContexts"].clear()
-        self._state["rezEnvirons"].clear()
-        self._state["testedEnvirons"].clear()
-        self._state["rezApps"].clear()
+        self._resolver.stop()
+
+        with self._apps_lock:
+            self._state["rezContexts"].clear()
+            self._state["rezEnvirons"].clear()
+            self._state["testedEnvirons"].clear()
+            util.clear_interned()
+            self._state["rezApps"].clear()
+            self._state["appSources"].clear()
+            self._state["unresolvedApps"].clear()
 
         def on_apps_found(apps):
             if not apps:
@@ -942,6 +1942,20 @@ class Controller(QtCore.QObject):
                 self._models["apps"].reset(apps)
                 self._state.to_ready()
 
+                lazy = (self._state.retrieve("showAllApps") and
+                        self._state.retrieve("resolveOnDemand"))
+
+                if lazy:
+                    # Fill in the rest, whilst idle
+                    self._resolver.start([
+                        (app_request, functools.partial(self._resolve_app,
+                                                        app_request))
+                        for app_request in self._state["unresolvedApps"]
+                    ])
+
+                else:
+                    self._resolve_remaining()
+
         def on_apps_not_found(error, trace):
             # Handled by on_unhandled_exception
             raise error
@@ -997,9 +2011,205 @@ class Controller(QtCore.QObject):
             on_failure=on_apps_not_found,
         )
 
+    def resolve_application(self, app_request,
+                            on_resolved=lambda app_request: None):
+        """Resolve `app_request` listed before being resolved
+
+        Arguments:
+            app_request (str): App to resolve, e.g. "maya==2020"
+            on_resolved (callable, optional): Called once resolved, with
+                the request of the app as patched, e.g. "maya==2019"
+
+        """
+
+        def on_success(result=None):
+            self._state.to_ready()
+            on_resolved(result or app_request)
+
+        def on_failure(error, trace):
+            # Handled by on_unhandled_exception
+            raise error
+
+        self._state.to_loading()
+        util.defer(self._resolve_app,
+                   args=[app_request],
+                   on_success=on_success,
+                   on_failure=on_failure)
+
+    def prefetch_application(self, app_request):
+        """Resolve `app_request` in the background, if not yet resolved"""
+        prefetching = self._state["prefetching"]
+
+        if app_request not in self._state["unresolvedApps"]:
+            return
+
+        if app_request in prefetching or not util.USE_THREADING:
+            return
+
+        def on_done(*args):
+            prefetching.discard(app_request)
+
+        prefetching.add(app_request)
+        util.defer(self._resolve_app,
+                   args=[app_request],
+                   on_success=on_done,
+                   on_failure=on_done)
+
+    def _resolve_remaining(self):
+        """Resolve apps listed before being resolved, most likely first
+
+        Each app is presented as soon as it resolves, with as many
+        resolved at once as there are resolve processes.
+
+        """
+
+        with self._apps_lock:
+            unresolved = self._state["unresolvedApps"]
+            profile_request = self._state["profileRequest"]
+            listed = list(unresolved)
+
+        ordered = self.usage_order(listed)
+        pool = self.resolve_pool()
+        size = pool.processes if pool else 1
+
+        def do():
+            for index in range(0, len(ordered), size):
+                if self._state["unresolvedApps"] is not unresolved:
+                    return  # Profile changed
+
+                chunk = ordered[index:index + size]
+
+                if len(chunk) > 1:
+                    # Into the resolve cache, in parallel
+                    self.env_many(profile_request,
+                                  [[app_request] for app_request in chunk])
+
+                for app_request in chunk:
+                    self._resolve_app(app_request,
+                                      unresolved=unresolved,
+                                      profile_request=profile_request)
+
+        def on_failure(error, trace):
+            self.error(trace)
+
+        util.defer(do, on_failure=on_failure)
+
+    def _resolve_app(self, app_request, wait=None,
+                     unresolved=None, profile_request=None):
+        """Resolve `app_request` listed before being resolved
+
+        Arguments:
+            app_request (str): App to resolve, e.g. "maya==2020"
+            wait (callable, optional): Unused, for Prewarmer
+            unresolved (dict, optional): Apps listed with the profile
+                of `profile_request`, defaults to the current ones
+
+        Returns:
+            str: Request of the app as patched, None if not resolved
+
+        """
+
+        if unresolved is None:
+            with self._apps_lock:
+                unresolved = self._state["unresolvedApps"]
+                profile_request = self._state["profileRequest"]
+
+        app_package = unresolved.get(app_request)
+
+        if app_package is None:
+            # Already resolved
+            return
+
+        _missing = (rez.PackageFamilyNotFoundError, rez.PackageNotFoundError)
+        patch = self._state.retrieve("patch", "").split()
+
+        request = profile_request + [app_request]
+        self.debug("Resolving request: %s" % " ".join(request))
+        unpatched = self.env_many(profile_request, [[app_request]])[0]
+
+        if isinstance(unpatched, _missing):
+            self.error("Resolve failed: %s" % str(unpatched))
+            unpatched = model.BrokenContext(app_package.name, request)
+
+        elif isinstance(unpatched, Exception):
+            raise unpatched
+
+        # Listed under its request as patched, like _list_apps
+        request, context = self._patch_context(
+            app_package, app_request, unpatched, patch, current_app=None
+        )
+
+        rez_pkg = next((
+            pkg for pkg in context.resolved_packages or []
+            if pkg.name == app_package.name
+        ), None) or model.BrokenPackage(app_request)
+
+        with self._apps_lock:
+            if self._state["unresolvedApps"] is not unresolved:
+                return  # Profile changed
+
+            # Stored together with patching, see _repatch
+            repatched = self._state.retrieve("patch", "").split() != patch
+
+            if not repatched:
+                if unresolved.pop(app_request, None) is None:
+                    return  # Resolved meanwhile
+
+                self._state["appSources"][request] = (app_package,
+                                                      unpatched)
+                self._state["rezContexts"][request] = context
+
+                # In place of the package it was listed by
+                self._state["rezApps"] = odict(
+                    (request, rez_pkg) if key == app_request else (key, pkg)
+                    for key, pkg in self._state["rezApps"].items()
+                )
+
+        if repatched:
+            # Patched meanwhile, patch anew from its unpatched context
+            return self._resolve_app(app_request, wait,
+                                     unresolved, profile_request)
+
+        self.application_resolved.emit(request)
+        return request
+
+    def on_application_resolved(self, app_request):
+        apps = self._models["apps"]
+        family = app_request.split("==", 1)[0]
+
+        # Or listed by its request prior to patching, see _resolve_app
+        row = next((row for row, item in enumerate(apps.items)
+                    if item["name"] == app_request), None)
+        if row is None:
+            row = next((row for row, item in enumerate(apps.items)
+                        if item["family"] == family and
+                        not item["resolved"]), None)
+
+        if row is None:
+            return
+
+        index = apps.index(row, 0)
+        rez_pkg = self._state["rezApps"][app_request]
+        broken = isinstance(rez_pkg, model.BrokenPackage)
+
+        if not broken:
+            apps.setData(index, rez_pkg, "package")
+            apps.setData(index, str(rez_pkg.version), "version")
+
+        apps.setData(index, app_request, "name")
+        apps.setData(index, broken, "broken")
+        apps.setData(index, True, "resolved")
+
+    @diagnostics.profiled
     def select_application(self, app_request):
         self._state["appRequest"] = app_request
 
+        if app_request in self._state["unresolvedApps"]:
+            return self.resolve_application(
+                app_request,
+                on_resolved=self.select_application
+            )
+
         try:
             context = self.context(app_request)
             environ = self.environ(app_request)
@@ -1013,6 +2223,10 @@ class Controller(QtCore.QObject):
             self._models["diagnose"].reset()
             raise
 
+        if isinstance(context, model.CompactContext) and context.nbytes:
+            self.debug("Context of %s holds %.1f kb compressed" % (
+                app_request, context.nbytes / 1024.0))
+
         self._models["packages"].reset(packages)
         self._models["context"].load(context.to_dict())
         self._models["environment"].load(environ)
@@ -1058,6 +2272,7 @@ class Controller(QtCore.QObject):
 
         return paths
 
+    @diagnostics.profiled
     def _list_apps(self, profile):
         # Each app has a unique context relative the current profile
         # Find it, and keep track of it.
@@ -1080,13 +2295,6 @@ class Controller(QtCore.QObject):
 
             qualified_profile_name = profile_variant.qualified_package_name
             profile_request = [qualified_profile_name]
-            self.debug("Resolving request: %s" % qualified_profile_name)
-
-            # Before resolving apps, need to know whether this profile can
-            # be resolved or not.
-            self.env(profile_request)
-
-        self.debug("Resolved profile context in %.2f seconds" % t.duration)
 
         # Resolve app with profile
 
@@ -1120,7 +2328,6 @@ class Controller(QtCore.QObject):
 
         # Optional patch
         patch = self._state.retrieve("patch", "").split()
-        patch_with_filter = self._state.retrieve("patchWithFilter", False)
 
         app_ranges = dict()
 
@@ -1143,60 +2350,130 @@ class Controller(QtCore.QObject):
             app_ranges[req.name] = app_vers
             return latest
 
-        def _try_resolve_context(req, pkg_name, mode):
-            kwargs = dict()
-            if mode == "Patch":
-                kwargs["use_filter"] = patch_with_filter
-            try:
-                return self.env(req, **kwargs)
-            except _missing as e_:
-                self.error("%s failed: %s" % (mode, str(e_)))
-                return model.BrokenContext(pkg_name, req)
-
         _missing = (rez.PackageFamilyNotFoundError, rez.PackageNotFoundError)
 
         contexts = odict()
+        resolved = dict()
         with util.timing() as t:
 
             current_app = self._state["appRequest"] or ""
             current_app = current_app.split("==", 1)[0]
 
-            for app_request in apps:
+            # Resolve those most likely to be used first
+            ordered = self.usage_order(apps)
+            app_packages = [_try_finding_latest_app(requested)
+                            for requested in ordered]
+            app_requests = ["%s==%s" % (app_package.name, app_package.version)
+                            for app_package in app_packages]
+
+            # Only the most likely app is resolved up-front, such that
+            # apps may be selected right away. The rest are resolved in
+            # the background, or on demand, see on_apps_found
+            eager = 1
+
+            unresolved = {
+                requested: (app_request, app_package)
+                for requested, app_package, app_request in zip(
+                    ordered[eager:], app_packages[eager:], app_requests[eager:]
+                )
+            }
 
-                app_package = _try_finding_latest_app(app_request)
+            # Before resolving apps, need to know whether this profile can
+            # be resolved or not, which is a resolve they all share.
+            self.debug("Resolving request: %s" % qualified_profile_name)
+            results = self.env_many(
+                profile_request,
+                [[request] for request in app_requests[:eager]]
+            )
 
-                app_request = "%s==%s" % (app_package.name,
-                                          app_package.version)
+            for requested, app_package, app_request, context in zip(
+                    ordered, app_packages, app_requests, results):
 
                 request = [qualified_profile_name, app_request]
-                self.debug("Resolving request: %s" % " ".join(request))
-                context = _try_resolve_context(request,
-                                               app_package.name,
-                                               mode="Resolve")
-
-                if context.success and patch:
-                    self.debug("Patching request: %s" % " ".join(patch))
-                    request = context.get_patched_request(patch)
-                    context = _try_resolve_context(request,
-                                                   app_package.name,
-                                                   mode="Patch")
-
-                # To avoid application selection change on patched or
-                # set back to default:
-                #   1. update context key `app_request`, and
-                #   2. update startup app
-                if context.success:
-                    for pkg in context.resolved_packages or []:
-                        if pkg.name == app_package.name:
-                            app_request = "%s==%s" % (pkg.name, pkg.version)
-                            if pkg.name == current_app:
-                                self._state.store("startupApplication",
-                                                  app_request)
-                            break
 
+                if isinstance(context, _missing):
+                    self.error("Resolve failed: %s" % str(context))
+                    context = model.BrokenContext(app_package.name, request)
+
+                elif isinstance(context, Exception):
+                    raise context
+
+                resolved[requested] = self._patch_context(
+                    app_package, app_request, context, patch, current_app
+                ) + (app_package, context)
+
+            # Present in their original order
+            sources = odict()
+            listed = odict()
+
+            for requested in apps:
+                if requested in unresolved:
+                    app_request, app_package = unresolved[requested]
+                    listed[app_request] = app_package
+                    continue
+
+                app_request, context, app_package, unpatched = \
+                    resolved[requested]
                 contexts[app_request] = context
+                sources[app_request] = (app_package, unpatched)
+
+        self.debug("Listed apps in %.2f seconds" % t.duration)
+
+        with self._apps_lock:
+            self._state["unresolvedApps"] = listed
+            self._state["profileRequest"] = profile_request
+            self._state["appSources"] = sources
+            self._state["appRanges"] = app_ranges
+
+            return self._associate_apps(contexts)
+
+    def _patch_context(self, app_package, app_request, context, patch,
+                       current_app):
+        """Apply `patch` to `context` of `app_package`
+
+        Returns:
+            tuple: Request of the app as patched, and patched context
+
+        """
+
+        _missing = (rez.PackageFamilyNotFoundError, rez.PackageNotFoundError)
+        patch_with_filter = self._state.retrieve("patchWithFilter", False)
+
+        if context.success and patch:
+            self.debug("Patching request: %s" % " ".join(patch))
+            request = context.get_patched_request(patch)
+
+            try:
+                context = self.env(request, use_filter=patch_with_filter)
+            except _missing as e_:
+                self.error("Patch failed: %s" % str(e_))
+                context = model.BrokenContext(app_package.name, request)
+
+        # To avoid application selection change on patched or
+        # set back to default:
+        #   1. update context key `app_request`, and
+        #   2. update startup app
+        if context.success:
+            for pkg in context.resolved_packages or []:
+                if pkg.name == app_package.name:
+                    app_request = "%s==%s" % (pkg.name, pkg.version)
+                    if pkg.name == current_app:
+                        self._state.store("startupApplication",
+                                          app_request)
+                    break
+
+        return app_request, context
+
+    def _associate_apps(self, contexts):
+        """Associate a Rez package with each app of `contexts`
+
+        Returns:
+            dict: Visible apps, for the apps model
+
+        """
+
+        self._state["rezApps"] = odict()
 
-        # Associate a Rez package with an app
         for app_request, rez_context in contexts.items():
             try:
                 rez_pkg = next(
@@ -1241,17 +2518,20 @@ class Controller(QtCore.QObject):
 
             self._state["rezApps"][app_request] = rez_pkg
 
-        self._state["rezContexts"] = contexts
+        # Listed by package alone, until resolved
+        for app_request, app_pkg in self._state["unresolvedApps"].items():
+            self._state["rezApps"][app_request] = app_pkg
 
-        self.debug("Resolved all contexts in %.2f seconds" % t.duration)
+        self._state["rezContexts"] = contexts
 
-        visible_apps = dict()
+        visible_apps = odict()
 
         # * Opt-out hidden application
         # * Find application versions
         show_hidden = self._state.retrieve("showHiddenApps")
+        app_ranges = self._state["appRanges"]
         for request, app_pkg in self._state["rezApps"].items():
-            data = allzparkconfig.metadata_from_package(app_pkg)
+            data = model.metadata_from_package(app_pkg)
             hidden = data.get("hidden", False)
 
             if hidden and not show_hidden:
@@ -1261,11 +2541,24 @@ class Controller(QtCore.QObject):
             visible_apps[request] = {
                 "package": app_pkg,
                 "versions": app_versions,
+                "resolved": request not in self._state["unresolvedApps"],
             }
 
         return visible_apps
 
+    @util.async_
     def graph(self):
+        """Render graph of the current context, emitting `graph_rendered`
+
+        Rendering happens in the background and images are cached on
+        disk per context digest, such that a context is only ever
+        rendered once.
+
+        Returns:
+            str: Path to where the image will be, None if broken
+
+        """
+
         context = self._state["rezContexts"][self._state["appRequest"]]
         if isinstance(context, model.BrokenContext):
             self._state.to_console()
@@ -1273,30 +2566,216 @@ class Controller(QtCore.QObject):
             self.error("Can not graph a broken context.")
             return
 
-        graph_str = context.graph(as_dot=True)
+        fname = os.path.join(cache_dir("graphs"),
+                             "%s.png" % context_digest(context))
+
+        def do():
+            if os.path.exists(fname):
+                self.debug("Using cached graph %s" % fname)
+
+                # Most recently used graphs are the last to be evicted
+                os.utime(fname, None)
+                return fname
+
+            graph_str = context.graph(as_dot=True)
+            tempdir = tempfile.mkdtemp()
+
+            try:
+                # Write elsewhere first, such that an interrupted
+                # render never ends up in the cache
+                temp = os.path.join(tempdir, "graph.png")
+
+                try:
+                    rez.save_graph(graph_str, temp)
+                except (IOError, OSError):
+                    # GraphViz, i.e. `dot`, not found
+                    return ""
+
+                shutil.move(temp, fname)
+
+            finally:
+                # Don't need this no more
+                shutil.rmtree(tempdir)
+
+            for name in evict_cache(os.path.dirname(fname), MaxCachedGraphs):
+                self.debug("Evicted cached graph %s" % name)
+
+            return fname
+
+        def on_success(result):
+            if not result:
+                self.error("GraphViz not found")
+
+            self.graph_rendered.emit(result)
+
+        def on_failure(error, trace):
+            self.error(trace)
+            self.graph_failed.emit()
+
+        util.defer(do, on_success=on_success, on_failure=on_failure)
+
+        return fname
+
+    def launch_history(self):
+        """Return launch count and time of last launch, per application
+
+        Returns:
+            dict: [count, last used] per application name
 
-        tempdir = tempfile.mkdtemp()
-        fname = os.path.join(tempdir, "graph.png")
+        """
 
         try:
-            rez.save_graph(graph_str, fname)
-            pixmap = QtGui.QPixmap(fname)
+            history = json.loads(self._state.retrieve("launchHistory") or "{}")
+        except ValueError:
+            # Corrupt or from a future version, start over
+            history = {}
+
+        if not isinstance(history, dict):
+            return {}
+
+        # Skip any corrupt entry, rather than the whole history
+        valid = {}
+        for name, entry in history.items():
+            try:
+                count, last_used = entry
+                valid[name] = [int(count), float(last_used)]
+            except (TypeError, ValueError):
+                continue
+
+        return valid
+
+    def record_launch(self, app_request):
+        """Add launch of `app_request` to the launch history
+
+        Only the most recently used applications are kept, per name
+        rather than version, such that the history stays compact.
+
+        """
+
+        name = app_request.split("==", 1)[0]
+        history = self.launch_history()
+        count, _ = history.get(name, (0, 0))
+        history[name] = [count + 1, time.time()]
+
+        recent = sorted(history, key=lambda n: history[n][1], reverse=True)
+        history = {n: history[n] for n in recent[:MaxLaunchHistory]}
+
+        self._state.store("launchHistory", json.dumps(history))
+
+    def usage_order(self, app_requests):
+        """Sort `app_requests` by how likely they are to be used
+
+        The startup application comes first, followed by applications
+        launched often and recently, followed by the rest in their
+        original order.
+
+        """
+
+        history = self.launch_history()
+        startup = self._state["appRequest"] or ""
+        startup = startup.split("==", 1)[0]
+        now = time.time()
+
+        def score(name):
+            try:
+                count, last_used = history[name]
+            except KeyError:
+                return 0.0
+
+            days = max(0.0, now - last_used) / 86400.0
+            return count / (1.0 + days)
+
+        def key(item):
+            index, request = item
+            name = rez.PackageRequest(request.strip("~")).name
+            return name != startup, -score(name), index
+
+        return [req for _, req in sorted(enumerate(app_requests), key=key)]
+
+    def shell_script(self, context, environ=None, shell=None):
+        """Return path to shell code applying `context` onto `environ`
+
+        Generating the code calls on every package.py:commands() in a
+        context, so it is written once per context digest, environment
+        and shell, and reused on subsequent launches until the next reset.
+        Files are written atomically, as they may be shared by launches
+        from more than one instance of Allzpark, and only the code of the
+        `MaxCachedShells` most recently used contexts is kept on disk.
+
+        Arguments:
+            context (ResolvedContext): Successfully resolved context
+            environ (dict, optional): Parent environment, defaults
+                to the current environment, as per Rez
+            shell (str, optional): Name of shell, defaults to that of Rez
+
+        Returns:
+            str: Path to shell code, None if `shell` cannot source it,
+                in which case launch via the context instead
+
+        """
+
+        if not context.success:
+            raise rez.ResolvedContextError(
+                "Cannot perform operation in a failed context")
+
+        environ = environ or os.environ.copy()
+        shell = shell or rez.config.default_shell or rez.system.shell
+
+        if not rez.can_spawn_shell(shell):
+            return None
+
+        digest = context_digest(context)
+        key = (digest, environ_digest(environ), shell)
+        scripts = self._state["shellScripts"]
 
-        except IOError:
-            self.error("GraphViz not found")
-            return QtGui.QPixmap()
+        with self._shell_lock:
+            context_file = scripts.get(key)
 
-        finally:
-            # Don't need this no more
-            shutil.rmtree(tempdir)
+            if context_file and os.path.exists(context_file):
+                # Most recently used scripts are the last to be evicted
+                os.utime(os.path.dirname(context_file), None)
+                return context_file
 
-        return pixmap
+            root = cache_dir("shells", digest)
+            rxt_file = os.path.join(root, "context.rxt")
+            context_file = os.path.join(root, "context-%s.%s" % (
+                key[1][:12], rez.create_shell(shell).file_extension()
+            ))
+
+            with util.timing() as t:
+                if not os.path.exists(rxt_file):
+                    with util.atomic_write(rxt_file) as temp:
+                        context.save(temp)
+
+                code = rez.shell_code(
+                    context, shell, environ, context_file, rxt_file
+                )
+
+            with util.atomic_write(context_file) as temp:
+                with open(temp, "w") as f:
+                    f.write(code)
+
+            self.debug("Generated %s in %.2f seconds" % (
+                context_file, t.duration))
+
+            os.utime(root, None)
+            for name in evict_cache(os.path.dirname(root), MaxCachedShells):
+                self.debug("Evicted cached shell code of %s" % name)
+
+            scripts[key] = context_file
+            return context_file
 
     def shell_code(self):
         app_request = self._state["appRequest"]
         context = self._state["rezContexts"][app_request]
         parent_env = self.parent_environ()
-        return context.get_shell_code(parent_environ=parent_env)
+        script = self.shell_script(context, parent_env)
+
+        if script is None:
+            return context.get_shell_code(parent_environ=parent_env)
+
+        with open(script) as f:
+            return f.read()
 
     def test_environment(self):
         app_request = self._state["appRequest"]
@@ -1313,6 +2792,7 @@ class Controller(QtCore.QObject):
             except json.JSONDecodeError:
                 self.info(message)  # regular messages during resolve
             else:
+                env = util.intern_environ(env)
                 self._state["testedEnvirons"][app_request] = env
                 self._models["diagnose"].load(env)
 
@@ -1337,6 +2817,7 @@ class Command(QtCore.QObject):
                  disabled=None,
                  detached=True,
                  environ=None,
+                 shell_script=None,
                  parent=None):
         super(Command, self).__init__(parent)
 
@@ -1344,6 +2825,9 @@ class Command(QtCore.QObject):
         self.disabled = disabled or {}  # unused
         self.environ = environ or {}
 
+        # Optional callable returning cached shell code of a context
+        self.shell_script = shell_script
+
         self.context = context
         self.app = package
         self.popen = None
@@ -1400,7 +2884,20 @@ class Command(QtCore.QObject):
         context = self.context
 
         try:
-            self.popen = context.execute_shell(**kwargs)
+            script = None
+            if self.shell_script is not None:
+                script = self.shell_script(context, kwargs["parent_environ"])
+
+            if script is None:
+                self.popen = context.execute_shell(**kwargs)
+
+            else:
+                command = kwargs.pop("command")
+                environ = kwargs.pop("parent_environ")
+                self.popen = rez.spawn_shell(
+                    context, script, None, command, environ, **kwargs
+                )
+
         except Exception as e:
             return self.error.emit(e)
 
@@ -0,0 +1,657 @@
+"""Where does time and memory go, for when Allzpark misbehaves"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import functools
+import threading
+import traceback
+
+from collections import OrderedDict as odict
+
+from .vendor.Qt import QtCore
+from .vendor import six
+
+# Python 3 only
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+log = logging.getLogger(__name__)
+
+
+def deep_getsizeof(obj, seen=None):
+    """Return size of `obj` in bytes, including what it contains
+
+    Only built-in containers are traversed, other objects are
+    accounted for by their own size alone.
+
+    """
+
+    seen = set() if seen is None else seen
+
+    if id(obj) in seen:
+        return 0
+
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        size += sum(deep_getsizeof(key, seen) + deep_getsizeof(value, seen)
+                    for key, value in obj.items())
+
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_getsizeof(item, seen) for item in obj)
+
+    return size
+
+
+def format_size(size):
+    for unit in ("b", "kb", "mb"):
+        if abs(size) < 1024:
+            return "%.1f %s" % (size, unit)
+        size /= 1024.0
+    return "%.1f gb" % size
+
+
+class MemoryProfiler(object):
+    """Compare allocations over time, using tracemalloc
+
+    The first snapshot is kept as a baseline, such that growth can be
+    seen both since the previous snapshot and since profiling started.
+
+    Arguments:
+        frames (int, optional): Depth of traceback kept per allocation,
+            deeper is more informative but more expensive
+
+    """
+
+    # Allocations made by profiling itself
+    Excludes = ("<frozen importlib._bootstrap>", "<unknown>", "*tracemalloc*")
+
+    def __init__(self, frames=1):
+        self._frames = frames
+        self._baseline = None
+        self._previous = None
+        self._current = None
+
+    @property
+    def available(self):
+        return tracemalloc is not None
+
+    def is_running(self):
+        return self.available and tracemalloc.is_tracing()
+
+    def start(self):
+        if not self.available:
+            log.warning("Memory profiling requires Python 3")
+            return False
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            log.info("Started memory profiling")
+
+        return True
+
+    def stop(self):
+        if self.is_running():
+            tracemalloc.stop()
+            log.info("Stopped memory profiling")
+
+        self._baseline = self._previous = self._current = None
+
+    def snapshot(self):
+        """Take snapshot of allocations made so far"""
+        if not self.is_running():
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, pattern)
+            for pattern in self.Excludes
+        ])
+
+        entry = (time.time(), snapshot)
+
+        if self._baseline is None:
+            self._baseline = entry
+
+        self._previous = self._current
+        self._current = entry
+
+        return snapshot
+
+    def report(self, sizes=None, limit=15):
+        """Return human-readable summary of the latest snapshot
+
+        Arguments:
+            sizes (dict, optional): Name to (entries, bytes) of
+                anything else to include, such as caches
+            limit (int, optional): Number of allocation sites per section
+
+        """
+
+        lines = []
+
+        if sizes:
+            lines += ["Sizes", "-----"]
+            for name, (entries, size) in sizes.items():
+                lines += ["%-32s %8d entries %12s" % (
+                    name, entries,
+                    "-" if size is None else format_size(size))]
+            lines += [""]
+
+        if not self.is_running():
+            lines += ["Memory profiling is off, see Preferences or "
+                      "set ALLZPARK_TRACEMALLOC=1"]
+            return "\n".join(lines)
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines += ["Traced %s, peak %s" % (format_size(current),
+                                          format_size(peak)), ""]
+
+        if self._current is None:
+            lines += ["No snapshot taken"]
+            return "\n".join(lines)
+
+        taken, snapshot = self._current
+        lines += ["Top allocations, %s" % time.ctime(taken), "---"]
+        lines += [str(stat) for stat in
+                  snapshot.statistics("lineno")[:limit]]
+
+        for title, entry in (("previous", self._previous),
+                             ("baseline", self._baseline)):
+            if entry is None or entry is self._current:
+                continue
+
+            then, before = entry
+            lines += ["", "Growth since %s, %s" % (title, time.ctime(then)),
+                      "---"]
+            lines += [str(stat) for stat in
+                      snapshot.compare_to(before, "lineno")[:limit]]
+
+        return "\n".join(lines)
+
+    def export(self, fname, sizes=None):
+        """Write report to `fname`, along with the raw snapshot"""
+        with open(fname, "w") as f:
+            f.write(self.report(sizes, limit=50))
+
+        if self._current is not None:
+            self._current[1].dump(os.path.splitext(fname)[0] + ".tracemalloc")
+
+        log.info("Exported memory report to %s" % fname)
+        return fname
+
+
+def controller_sizes(ctrl):
+    """Return number of entries and bytes held by caches and models
+
+    Returns:
+        odict: Name to (entries, bytes), bytes is None where unknown
+
+    """
+
+    from . import model, util, resources as res
+
+    state = ctrl.state
+    sizes = odict()
+
+    contexts = ctrl.context_stats()
+    sizes["rezContexts"] = (len(state["rezContexts"]),
+                            sum(s["bytes"] for s in contexts.values()))
+
+    for key in ("rezEnvirons",
+                "testedEnvirons",
+                "rezVersions",
+                "shellScripts",
+                "rezFailures"):
+        sizes[key] = (len(state[key]), deep_getsizeof(state[key]))
+
+    sizes["resolveCache"] = (
+        sum(len(entries) for entries in state["resolveCache"].values()),
+        None
+    )
+    sizes["rezCandidates"] = (len(state["rezCandidates"]), None)
+
+    interned = util.intern_stats()
+    sizes["util._interned"] = (interned["interned"], interned["size"])
+    sizes["util._lru_cache"] = (len(util._lru_cache), None)
+    sizes["resources._cache"] = (len(res._cache), None)
+    sizes["model._metadata"] = (len(model._metadata),
+                                deep_getsizeof(model._metadata))
+
+    for name, model_ in ctrl.models.items():
+        items = getattr(model_, "items", None)
+        if isinstance(items, list):
+            sizes["models.%s" % name] = (len(items), None)
+
+    return sizes
+
+
+def operation(frame):
+    """Return name of the outermost Allzpark call leading up to `frame`
+
+    That is, what the event loop called into, such as
+    "view.on_app_clicked" or "control.select_application".
+
+    """
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    vendor = os.path.join(root, "vendor")
+    outer = ("cli.py", "__main__.py")
+    name = "unknown"
+
+    while frame is not None:
+        fname = os.path.abspath(frame.f_code.co_filename)
+
+        if fname.startswith(root) and not fname.startswith(vendor) and \
+                os.path.basename(fname) not in outer:
+            module = os.path.splitext(os.path.basename(fname))[0]
+            name = "%s.%s" % (module, frame.f_code.co_name)
+
+        frame = frame.f_back
+
+    return name
+
+
+class Watchdog(QtCore.QObject):
+    """Capture what the GUI thread is doing when it stops responding
+
+    A timer on the GUI thread beats at a regular interval, and a
+    thread keeps an eye on it. Once beats stop for longer than
+    `threshold` the stack of the GUI thread is logged, and once it
+    resumes its duration is added to a histogram per operation.
+
+    Arguments:
+        threshold (float): Seconds without a beat considered a stall
+        interval (int, optional): Milliseconds between beats
+
+    """
+
+    # Upper bound, in seconds, of each histogram bucket
+    Buckets = (1, 2, 5, 10, 30, float("inf"))
+
+    def __init__(self, threshold, interval=100, parent=None):
+        super(Watchdog, self).__init__(parent)
+
+        timer = QtCore.QTimer(self)
+        timer.setInterval(interval)
+        timer.timeout.connect(self._beat)
+
+        self._threshold = threshold
+        self._timer = timer
+        self._last_beat = time.time()
+        self._stalled = None  # operation, while stalled
+        self._stalls = {}
+        self._ident = threading.current_thread().ident
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.is_running() or not self._threshold:
+            return
+
+        self._ident = threading.current_thread().ident
+        self._last_beat = time.time()
+        self._stopped = threading.Event()
+        self._timer.start()
+
+        self._thread = threading.Thread(target=self._watch,
+                                        args=(self._stopped,),
+                                        name="allzparkWatchdog")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching, waiting for its thread to exit"""
+        thread, self._thread = self._thread, None
+
+        self._stopped.set()
+        self._timer.stop()
+
+        if thread is not None:
+            thread.join()
+
+    def stalls(self):
+        """Return histogram of stalls
+
+        Returns:
+            dict: {operation: {"count", "total", "max", "buckets"}}
+
+        """
+
+        with self._lock:
+            return {
+                op: dict(stats, buckets=list(stats["buckets"]))
+                for op, stats in self._stalls.items()
+            }
+
+    def report(self):
+        stalls = self.stalls()
+
+        if not self.is_running():
+            return "Watchdog is off, see allzparkconfig.stall_threshold"
+
+        if not stalls:
+            return "No stalls longer than %.1f seconds" % self._threshold
+
+        header = "".join("%8s" % ("<%ss" % bound)
+                         for bound in self.Buckets[:-1])
+        header += "%8s" % (">%ss" % self.Buckets[-2])
+
+        lines = ["%-40s %6s %8s %8s %s" % (
+            "operation", "count", "total", "max", header)]
+
+        for op, stats in sorted(stalls.items(),
+                                key=lambda item: -item[1]["total"]):
+            lines += ["%-40s %6d %7.1fs %7.1fs %s" % (
+                op, stats["count"], stats["total"], stats["max"],
+                "".join("%8d" % count for count in stats["buckets"]))]
+
+        return "\n".join(lines)
+
+    def _beat(self):
+        now = time.time()
+        duration = now - self._last_beat
+        self._last_beat = now
+
+        with self._lock:
+            op, self._stalled = self._stalled, None
+
+        if op is None:
+            return
+
+        log.warning("GUI resumed after %.2f seconds in %s" % (duration, op))
+
+        with self._lock:
+            stats = self._stalls.setdefault(op, {
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "buckets": [0] * len(self.Buckets),
+            })
+
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["max"] = max(stats["max"], duration)
+
+            bucket = next(index for index, bound in enumerate(self.Buckets)
+                          if duration < bound)
+            stats["buckets"][bucket] += 1
+
+    def _watch(self, stopped):
+        while not stopped.wait(self._threshold / 4.0):
+            duration = time.time() - self._last_beat
+
+            if duration < self._threshold or self._stalled is not None:
+                continue
+
+            frame = sys._current_frames().get(self._ident)
+            if frame is None:
+                continue
+
+            op = operation(frame)
+            stack = "".join(traceback.format_stack(frame))
+
+            with self._lock:
+                self._stalled = op
+
+            log.warning("GUI stalled for %.2f seconds in %s\n%s" % (
+                duration, op, stack))
+
+
+class OpsProfiler(object):
+    """Profile each call to an operation, in whichever thread it runs
+
+    Every call is written to its own .pstats file, which can be
+    inspected with e.g. `python -m pstats` or snakeviz, and a
+    summary of the top functions is logged.
+
+    Calls made from within an already profiled call, in the
+    same thread, are included in the outer profile.
+
+    """
+
+    def __init__(self, limit=15):
+        self._limit = limit
+        self._root = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def is_running(self):
+        return self._root is not None
+
+    def start(self, root):
+        """Start writing profiles to `root`"""
+        self._root = root
+        log.info("Profiling operations into %s" % root)
+
+    def stop(self):
+        self._root = None
+
+    def call(self, name, func, *args, **kwargs):
+        root = self._root
+
+        if root is None or getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        self._local.active = True
+
+        try:
+            return profile.runcall(func, *args, **kwargs)
+
+        finally:
+            self._local.active = False
+            self._dump(root, name, profile)
+
+    def _dump(self, root, name, profile):
+        with self._lock:
+            self._count += 1
+            count = self._count
+
+        fname = os.path.join(root, "%s-%s-%03d.pstats" % (
+            time.strftime("%Y%m%d-%H%M%S"), name, count))
+        profile.dump_stats(fname)
+
+        summary = six.StringIO()
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats("cumulative").print_stats(self._limit)
+
+        log.info("Profiled %s in %s:\n%s" % (
+            name, fname, summary.getvalue()))
+
+
+ops = OpsProfiler()
+
+
+def profiled(func, name=None):
+    """Profile calls to `func` whenever `ops` is running
+
+    Usable as a decorator, or with a `name` for closures.
+
+    """
+
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return ops.call(name, func, *args, **kwargs)
+
+    return wrapper
+
+
+class Sampler(object):
+    """Sample the stack of every thread at a regular interval
+
+    Cheap enough to leave running, unlike cProfile, and counts where
+    time is spent rather than every call. Stacks are kept folded,
+    function by function, up to `max_stacks` unique stacks after
+    which further samples are counted towards "(other)".
+
+    Arguments:
+        rate (float): Samples per second
+        max_stacks (int, optional): Upper bound of unique stacks kept
+
+    """
+
+    Other = "(other)"
+
+    def __init__(self, rate, max_stacks=20000):
+        self._interval = 1.0 / rate if rate else 0
+        self._max_stacks = max_stacks
+        self._stacks = {}  # (thread, frames) -> count
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.is_running() or not self._interval:
+            return
+
+        self._stopped = threading.Event()
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._sample,
+                                        args=(self._stopped,),
+                                        name="allzparkSampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+        log.info("Sampling threads every %.3f seconds" % self._interval)
+
+    def stop(self):
+        """Stop sampling, waiting for its last sample to be taken"""
+        thread, self._thread = self._thread, None
+        self._stopped.set()
+
+        if thread is not None:
+            thread.join()
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+
+    def stacks(self):
+        with self._lock:
+            return dict(self._stacks)
+
+    def _sample(self, stopped):
+        own = threading.current_thread().ident
+
+        while not stopped.wait(self._interval):
+            names = {thread.ident: thread.name
+                     for thread in threading.enumerate()}
+
+            samples = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append((code.co_filename,
+                                   code.co_firstlineno,
+                                   code.co_name))
+                    frame = frame.f_back
+
+                thread = names.get(ident, "Thread-%d" % ident)
+                samples.append((thread, tuple(reversed(frames))))
+
+            with self._lock:
+                for key in samples:
+                    if key not in self._stacks and \
+                            len(self._stacks) >= self._max_stacks:
+                        key = (key[0], ((self.Other, 0, self.Other),))
+
+                    self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    @staticmethod
+    def _frame_name(frame):
+        fname, line, func = frame
+        if not line:
+            return func
+        module = os.path.splitext(os.path.basename(fname))[0]
+        return "%s:%s" % (module, func)
+
+    def folded(self):
+        """Return stacks in the format of Brendan Gregg's flamegraph.pl
+
+        E.g. "MainThread;cli:main;view:on_app_clicked 12"
+
+        """
+
+        lines = []
+        for (thread, frames), count in sorted(self.stacks().items()):
+            stack = ";".join([thread] + [self._frame_name(frame)
+                                         for frame in frames])
+            lines.append("%s %d" % (stack, count))
+
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        """Return stacks in the format of https://www.speedscope.app"""
+        frames = []
+        indices = {}
+        profiles = odict()
+
+        for (thread, stack), count in sorted(self.stacks().items()):
+            sample = []
+            for frame in stack:
+                if frame not in indices:
+                    indices[frame] = len(frames)
+                    fname, line, func = frame
+                    frames.append({
+                        "name": self._frame_name(frame),
+                        "file": fname,
+                        "line": line,
+                    })
+                sample.append(indices[frame])
+
+            profile = profiles.setdefault(thread, {
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": 0,
+                "samples": [],
+                "weights": [],
+            })
+
+            weight = count * self._interval
+            profile["samples"].append(sample)
+            profile["weights"].append(weight)
+            profile["endValue"] += weight
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "allzpark %s" % time.ctime(self._started or time.time()),
+            "exporter": "allzpark",
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+    def export(self, fname):
+        """Write samples to `fname`, speedscope if .json else folded"""
+        with open(fname, "w") as f:
+            if fname.endswith(".json"):
+                json.dump(self.speedscope(), f)
+            else:
+                f.write(self.folded())
+
+        log.info("Exported samples to %s" % fname)
+        return fname
@@ -9,7 +9,7 @@ from itertools import chain
 from .vendor.Qt import QtWidgets, QtCore, QtGui, QtCompat
 from .vendor import qargparse, QtImageViewer
 
-from . import resources as res, model, delegates, util
+from . import resources as res, model, delegates, util, diagnostics
 from . import _rezapi as rez
 from . import allzparkconfig
 
@@ -335,6 +335,8 @@ class Packages(AbstractDockWidget):
 
         widgets["args"].changed.connect(self.on_argument_changed)
         ctrl.resetted.connect(self.on_resetted)
+        ctrl.patch_changed.connect(self.on_patch_changed)
+        ctrl.localize_progressed.connect(self.on_localize_progressed)
 
         self._ctrl = ctrl
         self._panels = panels
@@ -344,21 +346,23 @@ class Packages(AbstractDockWidget):
     def on_argument_changed(self, arg):
         if arg["name"] == "useDevelopmentPackages":
             self._ctrl.state.store("useDevelopmentPackages", arg.read())
-            self._ctrl.reset()
+            self._ctrl.reset(clear_caches=False)
 
         if arg["name"] == "useLocalizedPackages":
             self._ctrl.state.store("useLocalizedPackages", arg.read())
-            self._ctrl.reset()
+            self._ctrl.reset(clear_caches=False)
 
         if arg["name"] == "patch":
             # (TODO) This will be called twice since qargparse.String
             #   may emit changed signal twice. And profile model item
             #   will get doubled.
             self._ctrl.state.store("patch", arg.read())
-            self._ctrl.reset()
+            self._ctrl.reset(clear_caches=False)
 
     def on_resetted(self):
-        patch = self._ctrl.state.retrieve("patch", "")
+        self.on_patch_changed(self._ctrl.state.retrieve("patch", ""))
+
+    def on_patch_changed(self, patch):
         arg = self._widgets["args"].find("patch")
         arg._write(patch)
         arg._previous = patch
@@ -385,6 +389,58 @@ class Packages(AbstractDockWidget):
                 disabled_count,
             ))
 
+    def on_localize_progressed(self, done, total, size):
+        self._widgets["status"].showMessage(
+            "Localised %d/%d Packages, %.2f mb" % (done, total, size)
+        )
+
+    def _source_model(self):
+        return self._widgets["view"].model().sourceModel()
+
+    def _related(self, package):
+        """Return names of `package` and everything it requires"""
+        model_ = self._source_model()
+        names = set(item["name"] for item in model_.items)
+        related = set()
+        queue = [package]
+
+        while queue:
+            package = queue.pop()
+            if package.name in related:
+                continue
+
+            related.add(package.name)
+
+            for request in package.requires or []:
+                if request.conflict or request.name not in names:
+                    continue
+
+                queue.append(model_.find(request.name)["package"])
+
+        return related
+
+    def _localizable(self, names=None):
+        """Return names of packages that may be localised"""
+        model_ = self._source_model()
+        return [
+            item["name"] for item in model_.items
+            if (names is None or item["name"] in names)
+            and item["relocatable"]
+            and not item.get(model.LocalizingRole)
+            and item["state"] not in ("(dev)", "(localised)")
+        ]
+
+    def _localize(self, names):
+        model_ = self._source_model()
+        self._ctrl.localize_all(names)
+
+        for name in names:
+            index = model_.findIndex(name)
+            model_.setData(index, "(localising..)", "state")
+            model_.setData(index, True, model.LocalizingRole)
+
+        self.message.emit("Localising %d packages.." % len(names))
+
     def on_state_appfailed(self):
         self._widgets["view"].setEnabled(False)
 
@@ -456,9 +512,13 @@ class Packages(AbstractDockWidget):
                 model_.data(index, "state") == "(localised)"
             )
 
-            # Not yet implemented
-            localize_all.setEnabled(False)
-            localize_related.setEnabled(False)
+            # These act on other packages too,
+            # regardless of the one clicked
+            related = self._related(model_.data(index, "package"))
+            localize_related.setToolTip("")
+            localize_related.setEnabled(bool(self._localizable(related)))
+            localize_all.setToolTip("")
+            localize_all.setEnabled(bool(self._localizable()))
 
         versions = model_.data(index, "versions")
         if len(versions) <= 1:
@@ -512,10 +572,13 @@ class Packages(AbstractDockWidget):
             self.message.emit("Package disabled")
 
         def on_localize():
-            name = model_.data(index, "name")
-            self._ctrl.localize(name)
-            model_.setData(index, "(localising..)", "state")
-            model_.setData(index, True, model.LocalizingRole)
+            self._localize([model_.data(index, "name")])
+
+        def on_localize_related():
+            self._localize(self._localizable(related))
+
+        def on_localize_all():
+            self._localize(self._localizable())
 
         def on_delocalize():
             name = model_.data(index, "name")
@@ -531,6 +594,8 @@ class Packages(AbstractDockWidget):
         openfile.triggered.connect(on_openfile)
         copyfile.triggered.connect(on_copyfile)
         localize.triggered.connect(on_localize)
+        localize_related.triggered.connect(on_localize_related)
+        localize_all.triggered.connect(on_localize_all)
         delocalize.triggered.connect(on_delocalize)
 
         menu.move(QtGui.QCursor.pos())
@@ -598,6 +663,8 @@ class Context(AbstractDockWidget):
         panels["central"].addTab(pages["code"], "Code")
 
         ctrl.application_changed.connect(self.on_application_changed)
+        ctrl.graph_rendered.connect(self.on_graph_rendered)
+        ctrl.graph_failed.connect(self.on_graph_failed)
 
         widgets["view"].setSortingEnabled(True)
         widgets["view"].sortByColumn(0, QtCore.Qt.AscendingOrder)
@@ -609,6 +676,7 @@ class Context(AbstractDockWidget):
         widgets["code"].setReadOnly(True)
 
         widgets["generateGraph"].clicked.connect(self.on_generate_clicked)
+        widgets["graph"].imageFileLoaded.connect(self.on_graph_loaded)
         widgets["graphHotkeys"].setText("""\
             <font color=\"steelblue\"><b>Hotkeys</b></font>
             <br>
@@ -641,12 +709,19 @@ class Context(AbstractDockWidget):
         self._widgets["printCode"].setEnabled(True)
 
     def on_generate_clicked(self):
-        pixmap = self._ctrl.graph()
+        self._widgets["generateGraph"].setEnabled(False)
+        self._widgets["generateGraph"].setText("Rendering..")
 
-        if pixmap is None:
-            return  # was graphing broken context
+        if self._ctrl.graph() is None:
+            # Was graphing broken context
+            self._widgets["generateGraph"].setEnabled(True)
+            self._widgets["generateGraph"].setText("Update")
 
-        if not pixmap:
+    def on_graph_rendered(self, fname):
+        self._widgets["generateGraph"].setEnabled(True)
+        self._widgets["generateGraph"].setText("Update")
+
+        if not fname:
             self._widgets["graphHotkeys"].setText(
                 "<b>GraphViz not found</b>"
                 "<br>"
@@ -658,7 +733,20 @@ class Context(AbstractDockWidget):
             self._widgets["generateGraph"].hide()
             return
 
-        self._widgets["graph"].setImage(pixmap)
+        # Decoded in the background, see on_graph_loaded
+        if not self._widgets["graph"].setImageFile(fname):
+            self.on_graph_loaded(fname, False)
+
+    def on_graph_failed(self):
+        self._widgets["generateGraph"].setEnabled(True)
+        self._widgets["generateGraph"].setText("Update")
+        self.message.emit("Graph failed, see console for details")
+
+    def on_graph_loaded(self, fname, ok):
+        if not ok:
+            self.message.emit("Could not load graph %s" % fname)
+            return
+
         self._widgets["graph"]._pixmapHandle.setGraphicsEffect(None)
 
     def on_print_code_clicked(self):
@@ -916,6 +1004,164 @@ class Commands(AbstractDockWidget):
         menu.show()
 
 
+class Diagnostics(AbstractDockWidget):
+    """Where time and memory goes, for when Allzpark misbehaves"""
+
+    icon = "File_Query_32"
+    advanced = True
+
+    def __init__(self, window, ctrl, parent=None):
+        super(Diagnostics, self).__init__("Diagnostics", parent)
+        self.setAttribute(QtCore.Qt.WA_StyledBackground)
+        self.setObjectName("Diagnostics")
+
+        panels = {
+            "central": QtWidgets.QTabWidget(),
+        }
+
+        pages = {
+            "memory": QtWidgets.QWidget(),
+            "stalls": QtWidgets.QWidget(),
+        }
+
+        widgets = {
+            "stallsReport": QtWidgets.QPlainTextEdit(),
+            "memoryReport": QtWidgets.QPlainTextEdit(),
+            "memoryFooter": QtWidgets.QWidget(),
+            "snapshot": QtWidgets.QPushButton("Snapshot"),
+            "exportMemory": QtWidgets.QPushButton("Export.."),
+        }
+
+        # Expose to CSS
+        for name, widget in chain(panels.items(),
+                                  pages.items(),
+                                  widgets.items()):
+            widget.setAttribute(QtCore.Qt.WA_StyledBackground)
+            widget.setObjectName(name)
+
+        layout = QtWidgets.QHBoxLayout(widgets["memoryFooter"])
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(widgets["snapshot"])
+        layout.addWidget(widgets["exportMemory"])
+        layout.addWidget(QtWidgets.QWidget(), 1)
+
+        layout = QtWidgets.QVBoxLayout(pages["memory"])
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(widgets["memoryReport"])
+        layout.addWidget(widgets["memoryFooter"])
+
+        layout = QtWidgets.QVBoxLayout(pages["stalls"])
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(widgets["stallsReport"])
+
+        panels["central"].addTab(pages["memory"], "Memory")
+        panels["central"].addTab(pages["stalls"], "Stalls")
+
+        for report in ("memoryReport", "stallsReport"):
+            widgets[report].setReadOnly(True)
+            widgets[report].setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+
+        widgets["snapshot"].clicked.connect(self.on_snapshot_clicked)
+        widgets["exportMemory"].clicked.connect(self.on_export_memory_clicked)
+
+        self._ctrl = ctrl
+        self._window = window
+        self._panels = panels
+        self._pages = pages
+        self._widgets = widgets
+
+        self.setWidget(panels["central"])
+
+    def sizes(self):
+        sizes = diagnostics.controller_sizes(self._ctrl)
+
+        console = self._window._docks["console"]._widgets["text"]
+        document = console.document()
+        sizes["console"] = (document.blockCount(),
+                            document.characterCount())
+
+        return sizes
+
+    def refresh(self):
+        self._widgets["memoryReport"].setPlainText(
+            self._ctrl.memory.report(self.sizes())
+        )
+        self._widgets["stallsReport"].setPlainText(
+            self._ctrl.watchdog.report()
+        )
+
+    def on_snapshot_clicked(self):
+        if self._ctrl.memory.snapshot() is None:
+            self.message.emit("Memory profiling is off, see Preferences")
+
+        self.refresh()
+
+    def on_export_memory_clicked(self):
+        fname, _ = QtCompat.QFileDialog.getSaveFileName(
+            self, "Export memory report",
+            "allzpark-memory-%s.txt" % time.strftime("%Y%m%d-%H%M%S"),
+            "Text (*.txt)"
+        )
+
+        if not fname:
+            return
+
+        self._ctrl.memory.export(fname, self.sizes())
+        self.message.emit("Exported memory report to %s" % fname)
+
+    def showEvent(self, event):
+        super(Diagnostics, self).showEvent(event)
+        self.refresh()
+
+    def on_export_samples(self):
+        fname, _ = QtCompat.QFileDialog.getSaveFileName(
+            self, "Export samples",
+            "allzpark-samples-%s.json" % time.strftime("%Y%m%d-%H%M%S"),
+            "Speedscope (*.json);;Folded stacks (*.txt)"
+        )
+
+        if not fname:
+            return
+
+        self._ctrl.sampler.export(fname)
+        self.message.emit("Exported samples to %s" % fname)
+
+    def on_context_menu(self, window):
+        def _on_context_menu(*args):
+            menu = MenuWithTooltip(window)
+
+            sampler = self._ctrl.sampler
+
+            def on_sample(checked):
+                if checked:
+                    sampler.start()
+                else:
+                    sampler.stop()
+
+            sample = QtWidgets.QAction("Sample threads", menu)
+            sample.setCheckable(True)
+            sample.setChecked(sampler.is_running())
+            sample.toggled.connect(on_sample)
+            sample.setToolTip(
+                "Sample the stack of every thread in the background,\n"
+                "at allzparkconfig.sample_rate per second"
+            )
+            menu.addAction(sample)
+
+            export = QtWidgets.QAction("Export samples..", menu)
+            export.triggered.connect(self.on_export_samples)
+            export.setToolTip(
+                "Save as speedscope .json, or as folded stacks\n"
+                "for flamegraph.pl"
+            )
+            menu.addAction(export)
+
+            menu.move(QtGui.QCursor.pos())
+            menu.show()
+
+        return _on_context_menu
+
+
 class EnvironmentEditor(QtWidgets.QWidget):
     applied = QtCore.Signal(dict)  # environment
     warning = QtCore.Signal(str)  # message
@@ -1098,6 +1344,11 @@ class Preferences(AbstractDockWidget):
                 "List everything from allzparkconfig:applications\n"
                 "not just the ones specified for a given profile."
             )),
+            qargparse.Boolean("resolveOnDemand", help=(
+                "With all apps shown, list them right away and\n"
+                "resolve each as it is selected or hovered, with\n"
+                "the rest resolved whilst idle."
+            )),
             qargparse.Boolean("showHiddenApps", help=(
                 "Show apps with metadata['hidden'] = True"
             )),
@@ -1113,6 +1364,11 @@ class Preferences(AbstractDockWidget):
                 "filter, such as *.beta packages, with every other \n"
                 "package still qualifying for that filter."
             )),
+            qargparse.Boolean("memoryProfiling", help=(
+                "Trace memory allocations, for the Diagnostics dock.\n"
+                "Slows Allzpark down, use when investigating growth.\n"
+                "Also enabled with ALLZPARK_TRACEMALLOC=1"
+            )),
             qargparse.Integer("clearCacheTimeout", min=1, default=10, help=(
                 "Clear package repository cache at this interval, in \n"
                 "seconds.\n\n"
@@ -1303,6 +1559,9 @@ class PushButtonWithMenu(QtWidgets.QPushButton):
 class LineEditWithCompleter(QtWidgets.QLineEdit):
     changed = QtCore.Signal(str)
 
+    # A completion is highlighted, but not yet chosen
+    highlighted = QtCore.Signal(str)
+
     def __init__(self, parent=None):
         super(LineEditWithCompleter, self).__init__(parent)
 
@@ -1316,6 +1575,7 @@ class LineEditWithCompleter(QtWidgets.QLineEdit):
 
         self.setCompleter(completer)
         self.editingFinished.connect(self.onEditingFinished)
+        completer.highlighted[str].connect(self.highlighted.emit)
 
         self._completer = completer
         self._focused = False
@@ -1507,6 +1767,12 @@ class ProfileView(QtWidgets.QTreeView):
 
     activated = QtCore.Signal(str)
 
+    # The user is pointing at a profile, empty when pointing elsewhere
+    hovered = QtCore.Signal(str)
+
+    # Milliseconds to point at a profile before it counts as hovered
+    HoverDwell = 300
+
     def __init__(self, parent=None):
         super(ProfileView, self).__init__(parent)
 
@@ -1514,8 +1780,39 @@ class ProfileView(QtWidgets.QTreeView):
         self.setSortingEnabled(True)
         self.sortByColumn(0, QtCore.Qt.AscendingOrder)
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.setMouseTracking(True)
+
+        dwell = QtCore.QTimer(self)
+        dwell.setSingleShot(True)
+        dwell.setInterval(self.HoverDwell)
+        dwell.timeout.connect(self.on_dwelled)
 
         self.customContextMenuRequested.connect(self.on_context_menu)
+        self.entered.connect(self.on_entered)
+
+        self._dwell = dwell
+        self._pointed = None
+
+    def on_entered(self, index):
+        self._pointed = index.data(model.NameRole)
+        self._dwell.start()
+
+    def on_dwelled(self):
+        if self._pointed:
+            self.hovered.emit(self._pointed)
+
+    def leaveEvent(self, event):
+        self._pointed = None
+        self._dwell.stop()
+        self.hovered.emit("")
+        return super(ProfileView, self).leaveEvent(event)
+
+    def currentChanged(self, current, previous):
+        super(ProfileView, self).currentChanged(current, previous)
+
+        # Arrowing onto a profile counts as pointing at it
+        if current.isValid():
+            self.hovered.emit(current.data(model.NameRole) or "")
 
     def on_context_menu(self, position):
         index = self.indexAt(position)
@@ -1683,8 +1980,10 @@ class Profiles(AbstractDockWidget):
 
         # signals
         view.activated.connect(self.profile_changed.emit)
+        view.hovered.connect(ctrl.prefetch_profile)
         selection.currentChanged.connect(self.on_selected_profile_changed)
         version.changed.connect(self.version_changed.emit)
+        version.highlighted.connect(self.on_version_highlighted)
         search.textChanged.connect(view.expandAll)
         search.textChanged.connect(proxy.setFilterFixedString)
         widgets["refresh"].clicked.connect(self.reset.emit)
@@ -1730,6 +2029,22 @@ class Profiles(AbstractDockWidget):
             reset.setToolTip("Re-scan repository for new Rez packages")
             menu.addAction(reset)
 
+            if self._ctrl.state.retrieve("showAdvancedControls"):
+                def on_profile_ops(checked):
+                    self._ctrl.profile_operations(checked)
+                    self.message.emit("%s profiling operations" % (
+                        "Started" if checked else "Stopped"))
+
+                profile_ops = QtWidgets.QAction("Profile operations", menu)
+                profile_ops.setCheckable(True)
+                profile_ops.setChecked(diagnostics.ops.is_running())
+                profile_ops.toggled.connect(on_profile_ops)
+                profile_ops.setToolTip(
+                    "Write a cProfile .pstats file per reset, change of\n"
+                    "profile, selection of application, patch and launch"
+                )
+                menu.addAction(profile_ops)
+
             menu.addSeparator()
 
             menu.move(QtGui.QCursor.pos())
@@ -1753,6 +2068,9 @@ class Profiles(AbstractDockWidget):
 
         proxy.invalidateFilter()
 
+    def on_version_highlighted(self, version):
+        self._ctrl.prefetch_profile(self._models["source"].current, version)
+
     def on_selected_profile_changed(self):
         view = self._widgets["view"]
         self.update_favorite_btn(view.selected_profile())
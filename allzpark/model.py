@@ -35,8 +35,11 @@ but not vice versa as that would implicate a view when using it standalone.
 
 import re
 import os
+import json
+import zlib
 import logging
 import itertools
+import threading
 
 from . import allzparkconfig, util, resources as res
 from . import _rezapi as rez
@@ -64,6 +67,43 @@ BetaRole = QtCore.Qt.UserRole + 2
 LatestRole = QtCore.Qt.UserRole + 3
 NameRole = QtCore.Qt.UserRole + 4
 
+_styles = {}
+_beta = re.compile(r".beta$")
+_metadata = {}
+_metadata_stats = {"calls": 0, "misses": 0, "duration": 0.0}
+_hydrated = []  # Most recently rehydrated contexts, last is latest
+_hydrated_lock = threading.Lock()
+
+# Number of CompactContext to keep rehydrated at any one time
+MaxHydrated = 4
+
+
+def font(bold=False, strikeout=False, italic=False):
+    """Return a shared QFont, rather than one per call to `data()`"""
+    key = ("font", bold, strikeout, italic)
+
+    try:
+        return _styles[key]
+    except KeyError:
+        value = QtGui.QFont()
+        value.setBold(bold)
+        value.setStrikeOut(strikeout)
+        value.setItalic(italic)
+        _styles[key] = value
+        return value
+
+
+def color(name):
+    """Return a shared QColor, rather than one per call to `data()`"""
+    key = ("color", name)
+
+    try:
+        return _styles[key]
+    except KeyError:
+        value = QtGui.QColor(name)
+        _styles[key] = value
+        return value
+
 
 class AbstractTableModel(QtCore.QAbstractTableModel):
     ColumnToKey = {}
@@ -72,10 +112,37 @@ class AbstractTableModel(QtCore.QAbstractTableModel):
     def __init__(self, parent=None):
         super(AbstractTableModel, self).__init__(parent)
         self.items = []
+        self._icon_rows = {}  # iconPath -> rows
+
+        res.icon_cache().loaded.connect(self.on_icon_loaded)
 
     def reset(self, items=None):
         pass
 
+    def index_icons(self, first=0):
+        """Map icon paths to rows, from row `first` onwards"""
+        if not first:
+            self._icon_rows.clear()
+
+        for row in range(first, len(self.items)):
+            path = self.items[row].get("iconPath")
+            if path:
+                self._icon_rows.setdefault(path, []).append(row)
+
+    def on_icon_loaded(self, path):
+        """Replace placeholder icons once decoded in the background"""
+        rows = self._icon_rows.get(path)
+        if not rows:
+            return
+
+        icon = res.icon_cache().get(path)
+
+        for row in rows:
+            item = self.items[row]
+            item["icon"] = icon
+            index = self.createIndex(row, 0, QtCore.QModelIndex())
+            QtCompat.dataChanged(self, index, index, [IconRole])
+
     def find(self, name):
         return next(i for i in self.items if i["name"] == name)
 
@@ -146,7 +213,64 @@ class AbstractTableModel(QtCore.QAbstractTableModel):
         return True
 
 
-def parse_icon(root, template):
+def metadata_from_package(variant):
+    """Memoized allzparkconfig.metadata_from_package
+
+    The user-provided hook may be expensive, and is queried for the
+    same package by the controller and each model. Its result is
+    cached per package, shared by its variants, such that an app listed
+    by package and later resolved into a variant is only queried once,
+    until `clear_metadata` is called.
+
+    Arguments:
+        variant (rez.packages_.Variant): Package from which to retrieve data
+
+    """
+
+    key = (
+        _strip_index(getattr(variant, "qualified_name", None) or
+                     str(variant)),
+        _strip_index(getattr(variant, "uri", None)),
+    )
+
+    _metadata_stats["calls"] += 1
+
+    try:
+        data = _metadata[key]
+
+    except KeyError:
+        with util.timing() as t:
+            data = allzparkconfig.metadata_from_package(variant)
+
+        _metadata[key] = data
+        _metadata_stats["misses"] += 1
+        _metadata_stats["duration"] += t.duration
+
+        log.debug("metadata_from_package(%s) in %.3f seconds"
+                  % (key[0], t.duration))
+
+    # Callers are free to modify their copy
+    return dict(data)
+
+
+def _strip_index(name):
+    """Return `name` of a variant without its index, e.g. app-1[0] -> app-1"""
+    if name and name.endswith("]"):
+        name = name.rsplit("[", 1)[0]
+
+    return name
+
+
+def metadata_stats():
+    """Return number of calls, cache misses and time spent in the hook"""
+    return dict(_metadata_stats, cached=len(_metadata))
+
+
+def clear_metadata():
+    _metadata.clear()
+
+
+def icon_path(root, template):
     try:
         fname = template.format(
             root=root,
@@ -159,16 +283,26 @@ def parse_icon(root, template):
     except KeyError:
         fname = ""
 
-    return QtGui.QIcon(fname)
+    return util.normpath(fname) if fname else ""
+
+
+def parse_icon(root, template):
+    return res.icon_cache().get(icon_path(root, template))
 
 
 class AbstractPackageItem(dict):
 
     def __init__(self, name, package, versions, metadata):
+        # Apps listed ahead of being resolved are packages, not variants
+        root = getattr(package, "root", None) or \
+            getattr(package, "base", None) or ""
+        path = icon_path(root, template=metadata["icon"])
+
         super(AbstractPackageItem, self).__init__({
             "name": name,
             "label": metadata["label"],
-            "icon": parse_icon(package.root, template=metadata["icon"]),
+            "icon": res.icon_cache().get(path),
+            "iconPath": path,
             "family": package.name,
             "package": package,
             "version": str(package.version),
@@ -185,7 +319,7 @@ class ApplicationItem(AbstractPackageItem):
     def __init__(self, app_request, data):
         app_pkg = data["package"]
         versions = data["versions"]
-        metadata = allzparkconfig.metadata_from_package(app_pkg)
+        metadata = metadata_from_package(app_pkg)
         tools = getattr(app_pkg, "tools", None) or [app_pkg.name]
 
         super(ApplicationItem, self).__init__(name=app_request,
@@ -198,6 +332,7 @@ class ApplicationItem(AbstractPackageItem):
             "tool": None,  # Current tool
             "tools": tools,  # All available tools
             "detached": False,  # Open in separate console or not
+            "resolved": data.get("resolved", True),  # Or resolve on demand
         })
 
 
@@ -206,7 +341,7 @@ class PackageItem(AbstractPackageItem):
     def __init__(self, name, data):
         package = data["package"]
         versions = data["versions"]
-        metadata = allzparkconfig.metadata_from_package(package)
+        metadata = metadata_from_package(package)
         relocatable = localz.is_relocatable(package) if localz else False
         state = (
             "(dev)" if is_local(package) else
@@ -226,6 +361,16 @@ class PackageItem(AbstractPackageItem):
             "localizing": False,  # in progress
         })
 
+        self.update_flags()
+
+    def update_flags(self):
+        """Compute latest/beta columns, once per reset or override"""
+        version = self["override"] or self["version"]
+        versions = self["versions"]
+
+        self["latest"] = "x" if versions and version == versions[-1] else ""
+        self["beta"] = "x" if _beta.search(version) else ""
+
 
 class ApplicationModel(AbstractTableModel):
     ColumnToKey = {
@@ -257,6 +402,7 @@ class ApplicationModel(AbstractTableModel):
             item = ApplicationItem(app_request, data)
             self.items.append(item)
 
+        self.index_icons()
         self.endResetModel()
 
     def data(self, index, role):
@@ -270,16 +416,14 @@ class ApplicationModel(AbstractTableModel):
 
         if data["hidden"]:
             if role == QtCore.Qt.ForegroundRole:
-                return QtGui.QColor("gray")
+                return color("gray")
 
         if data["broken"]:
             if role == QtCore.Qt.ForegroundRole:
-                return QtGui.QColor("red")
+                return color("red")
 
             if role == QtCore.Qt.FontRole:
-                font = QtGui.QFont()
-                font.setBold(True)
-                return font
+                return font(bold=True)
 
             if role == QtCore.Qt.DisplayRole:
                 if col == 0:
@@ -289,11 +433,16 @@ class ApplicationModel(AbstractTableModel):
                 if col == 0:
                     return self._broken_icon
 
+        if not data["resolved"] and col == 0:
+            if role == QtCore.Qt.FontRole:
+                return font(italic=True)
+
+            if role == QtCore.Qt.ToolTipRole:
+                return "Not yet resolved"
+
         if data["_hasVersions"] and col == 1:
             if role == QtCore.Qt.FontRole:
-                font = QtGui.QFont()
-                font.setBold(True)
-                return font
+                return font(bold=True)
 
         return super(ApplicationModel, self).data(index, role)
 
@@ -308,6 +457,144 @@ class ApplicationModel(AbstractTableModel):
         return super(ApplicationModel, self).flags(index)
 
 
+class CompactPackage(object):
+    """A resolved package of a CompactContext, by name and version
+
+    Anything else is looked up on the package of its rehydrated context.
+
+    """
+
+    def __init__(self, context, variant):
+        self._context = context
+        self.name = variant.name
+        self.version = variant.version
+        self.qualified_name = variant.qualified_name
+        self.uri = variant.uri
+
+    def __str__(self):
+        return self.qualified_name
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+
+        for variant in self._context.rehydrate().resolved_packages:
+            if variant.name == self.name:
+                return getattr(variant, attr)
+
+        raise AttributeError(attr)
+
+
+class CompactContext(object):
+    """A resolved context, kept compressed until needed
+
+    Holds onto what listing apps and packages needs, namely the request,
+    resolved packages, timestamp and whether it was successful. Of the
+    resolved packages, only those requested are kept in full, the rest
+    by name and version. Only the `MaxHydrated` most recently used
+    contexts are kept in full, the rest are serialised and compressed,
+    and rehydrated when anything else is asked for, such as its
+    environment or graph.
+
+    Arguments:
+        context (ResolvedContext): Successfully resolved context
+
+    """
+
+    def __init__(self, context):
+        self._full = None
+        self._payload = None
+        self._request = context.requested_packages()
+
+        requested = set(req.name for req in self._request)
+
+        self.success = context.success
+        self.solve_time = getattr(context, "solve_time", 0.0)
+        self.timestamp = context.timestamp
+        self.resolved_packages = [
+            variant if variant.name in requested
+            else CompactPackage(self, variant)
+            for variant in context.resolved_packages
+        ]
+        self.failure_description = context.failure_description
+
+        # Compressed once no longer among the most recently used
+        with _hydrated_lock:
+            self._hydrate(context)
+
+    @property
+    def nbytes(self):
+        """Size of the compressed context in bytes, 0 until compressed"""
+        payload = self._payload
+        return len(payload) if payload is not None else 0
+
+    @property
+    def hydrated(self):
+        return self._full is not None
+
+    def requested_packages(self, include_implicit=False):
+        if include_implicit:
+            return self.rehydrate().requested_packages(include_implicit)
+        return self._request
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return self.rehydrate().to_dict(fields)
+
+        full = self._full
+        if full is not None:
+            return full.to_dict()
+
+        # No need to rehydrate for the full dictionary
+        return json.loads(self._decompress())
+
+    def rehydrate(self):
+        """Return the full ResolvedContext"""
+        with _hydrated_lock:
+            full = self._full
+
+            if full is None:
+                data = json.loads(self._decompress())
+                full = rez.env.from_dict(data)
+
+            return self._hydrate(full)
+
+    def _hydrate(self, full):
+        """Keep `full` as the most recently used, compressing the least
+
+        Call with `_hydrated_lock` held.
+
+        """
+
+        self._full = full
+
+        if self in _hydrated:
+            _hydrated.remove(self)
+
+        _hydrated.append(self)
+
+        while len(_hydrated) > MaxHydrated:
+            _hydrated.pop(0)._compress()
+
+        return full
+
+    def _compress(self):
+        if self._payload is None:
+            data = json.dumps(self._full.to_dict())
+            self._payload = zlib.compress(data.encode("utf-8"))
+
+        self._full = None
+
+    def _decompress(self):
+        return zlib.decompress(self._payload).decode("utf-8")
+
+    def __getattr__(self, attr):
+        # Anything not kept compact, e.g. get_environ() or graph()
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.rehydrate(), attr)
+
+
 class BrokenContext(object):
     broken_dict = {"error": "Failed context"}
 
@@ -420,6 +707,7 @@ class PackagesModel(AbstractTableModel):
             item = PackageItem(name, data)
             self.items.append(item)
 
+        self.index_icons()
         self.endResetModel()
 
     def data(self, index, role):
@@ -436,48 +724,23 @@ class PackagesModel(AbstractTableModel):
                 return data["override"]
 
             if role == QtCore.Qt.FontRole:
-                font = QtGui.QFont()
-                font.setBold(True)
-                return font
+                return font(bold=True)
 
             if role == QtCore.Qt.ForegroundRole:
-                return QtGui.QColor("darkorange")
+                return color("darkorange")
 
         if data["disabled"] or data["localizing"]:
             if role == QtCore.Qt.FontRole:
-                font = QtGui.QFont()
-                font.setBold(True)
-                font.setStrikeOut(True)
-                return font
+                return font(bold=True, strikeout=True)
 
             if role == QtCore.Qt.ForegroundRole:
-                return QtGui.QColor("darkorange")
+                return color("darkorange")
 
         if data["_hasVersions"] and col == 1:
             if role == QtCore.Qt.FontRole:
-                font = QtGui.QFont()
-                font.setBold(True)
-                return font
-
-        try:
-            return data[role]
-
-        except KeyError:
-            try:
-                key = self.ColumnToKey[col][role]
-            except KeyError:
-                return None
-
-        if key == "beta":
-            version = data["override"] or data["version"]
-            return "x" if re.findall(r".beta$", version) else ""
-
-        if key == "latest":
-            version = data["override"] or data["version"]
-            latest = data["versions"][-1]
-            return "x" if version == latest else ""
+                return font(bold=True)
 
-        return data[key]
+        return super(PackagesModel, self).data(index, role)
 
     def setData(self, index, value, role):
         if role == "override":
@@ -503,7 +766,21 @@ class PackagesModel(AbstractTableModel):
 
             self._disabled[package] = value
 
-        return super(PackagesModel, self).setData(index, value, role)
+        changed = super(PackagesModel, self).setData(index, value, role)
+
+        if changed and role == "override":
+            # Latest and beta columns follow the override
+            row = index.row()
+            self.items[row].update_flags()
+            QtCompat.dataChanged(
+                self,
+                self.createIndex(row, 0, QtCore.QModelIndex()),
+                self.createIndex(row, self.columnCount(None) - 1,
+                                 QtCore.QModelIndex()),
+                [QtCore.Qt.DisplayRole]
+            )
+
+        return changed
 
     def flags(self, index):
         if index.column() == 1:
@@ -536,17 +813,20 @@ class CommandsModel(AbstractTableModel):
         index = len(self.items)
         app = command.app
         root = os.path.dirname(app.uri)
-        data = allzparkconfig.metadata_from_package(app)
+        data = metadata_from_package(app)
+        path = icon_path(root, template=data["icon"])
 
         self.beginInsertRows(QtCore.QModelIndex(), index, index + 1)
         self.items.append({
             "cmd": command.cmd,
             "pid": None,
             "running": "waiting..",
-            "icon": parse_icon(root, template=data["icon"]),
+            "icon": res.icon_cache().get(path),
+            "iconPath": path,
             "object": command,
             "appName": app.name,
         })
+        self.index_icons(first=index)
         self.endInsertRows()
 
     def poll(self):
@@ -599,19 +879,157 @@ class JsonModel(qjsonmodel.QJsonModel):
     reset = qjsonmodel.QJsonModel.clear
 
 
-class EnvironmentModel(JsonModel):
-    def load(self, data):
-        # Convert PATH environment variables to lists
-        # for improved viewing experience
-        for key, value in data.copy().items():
-            if os.pathsep in value:
-                value = value.split(os.pathsep)
-            data[key] = value
+class LazyJsonItem(qjsonmodel.QJsonTreeItem):
+    """JSON tree item whose children are created on first expand
+
+    Arguments:
+        key (str or int): Name of this item, relative its parent
+        value (object): JSON-compatible value
+        parent (LazyJsonItem, optional): Parent item
+        split (bool, optional): Whether strings containing `os.pathsep`
+            are presented as a list of paths, applies to children too
+
+    """
+
+    def __init__(self, key, value, parent=None, split=False):
+        super(LazyJsonItem, self).__init__(parent)
+        self._key = key
+        self._data = value
+        self._split = split
+        self._fetched = False
+
+        if self.is_container():
+            self._type = list if self.is_path() else type(value)
+        else:
+            self._type = type(value)
+            self._value = value
+
+    def is_path(self):
+        return (
+            self._split and
+            isinstance(self._data, six.string_types) and
+            os.pathsep in self._data
+        )
+
+    def is_container(self):
+        return isinstance(self._data, (dict, list, tuple)) or self.is_path()
+
+    def can_fetch(self):
+        return not self._fetched and self.is_container()
+
+    def size(self):
+        """Number of children, without creating them"""
+        if self.is_path():
+            return self._data.count(os.pathsep) + 1
+
+        return len(self._data) if self.is_container() else 0
+
+    def fetch(self):
+        """Create children, returns how many were created"""
+        if not self.can_fetch():
+            return 0
+
+        value = self._data
+
+        if isinstance(value, dict):
+            items = sorted(value.items())
+        elif self.is_path():
+            items = enumerate(util.intern_segments(value))
+        else:
+            items = enumerate(value)
+
+        for key, value in items:
+            child = LazyJsonItem(key, value, parent=self, split=self._split)
+            self.appendChild(child)
+
+        self._fetched = True
+        return self.childCount()
+
+    def json(self):
+        if self.is_path():
+            return self._data.split(os.pathsep)
+
+        if isinstance(self._data, dict):
+            return {
+                key: LazyJsonItem(key, value, split=self._split).json()
+                for key, value in self._data.items()
+            }
+
+        if isinstance(self._data, (list, tuple)):
+            return [
+                LazyJsonItem(key, value, split=self._split).json()
+                for key, value in enumerate(self._data)
+            ]
+
+        return self._data
+
+
+class LazyJsonModel(JsonModel):
+    """JsonModel creating items only as they are expanded
+
+    Large documents, such as a resolved environment, would otherwise
+    be traversed in full on the GUI thread on every load.
+
+    """
+
+    SplitPaths = False
+
+    def load(self, document):
+        assert isinstance(document, (dict, list, tuple)), (
+            "`document` must be of dict, list or tuple, "
+            "not %s" % type(document)
+        )
+
+        self.beginResetModel()
+
+        self._rootItem = LazyJsonItem("root", document, split=self.SplitPaths)
+        self._rootItem.fetch()
+
+        self.endResetModel()
+
+        return True
+
+    def genJson(self, item):
+        return item.json()
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return self._rootItem.childCount() > 0
+
+        if parent.column() > 0:
+            return False
+
+        return parent.internalPointer().is_container()
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+
+        return parent.internalPointer().can_fetch()
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        item = parent.internalPointer()
+        count = item.size()
+
+        if not count:
+            item.fetch()
+            return
+
+        self.beginInsertRows(parent, 0, count - 1)
+        item.fetch()
+        self.endInsertRows()
+
 
-        super(EnvironmentModel, self).load(data)
+class EnvironmentModel(LazyJsonModel):
+    # Present PATH-like environment variables as lists
+    # for improved viewing experience
+    SplitPaths = True
 
 
-class ContextModel(JsonModel):
+class ContextModel(LazyJsonModel):
     pass
 
 
@@ -976,7 +1394,7 @@ class ProfileModel(AbstractTreeModel):
         for name, versions in profiles.items():
             # NOTE: This model only takes the latest profile
             package = versions[Latest]
-            data = allzparkconfig.metadata_from_package(package)
+            data = metadata_from_package(package)
 
             item = TreeItem({
                 "name": name,
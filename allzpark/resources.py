@@ -1,12 +1,15 @@
 import os
 import logging
+import threading
 from collections import OrderedDict as odict
-from . import allzparkconfig
-from .vendor.Qt import QtGui
+from . import allzparkconfig, util
+from .vendor.Qt import QtGui, QtCore
+from .vendor.six.moves import queue
 
 dirname = os.path.dirname(__file__)
 _cache = {}
 _themes = odict()
+_icon_cache = []
 
 
 def px(value, scale=1.0):
@@ -40,6 +43,99 @@ def icon(*paths):
     return QtGui.QIcon(pixmap(*paths))
 
 
+class IconCache(QtCore.QObject):
+    """Process-wide cache of icons provided by packages
+
+    Package icons typically reside alongside the package on a network
+    share, so rather than reading them on the GUI thread they are
+    decoded in a background thread. A placeholder is returned until
+    then, and `loaded` is emitted once the real icon is available.
+
+    """
+
+    loaded = QtCore.Signal(str)  # path
+    _decoded = QtCore.Signal(str, object, int)  # path, QImage, generation
+
+    def __init__(self, parent=None):
+        super(IconCache, self).__init__(parent)
+
+        self._icons = {}
+        self._pending = set()
+        self._generation = 0  # Incremented on clear
+        self._queue = queue.Queue()
+        self._thread = None
+
+        self._decoded.connect(self._on_decoded)
+
+    def get(self, path, placeholder=None):
+        """Return icon of `path`, or `placeholder` if not yet decoded
+
+        Arguments:
+            path (str): Absolute path to image on disk
+            placeholder (QtGui.QIcon, optional): Returned until
+                the icon has been decoded, defaults to an empty icon
+
+        """
+
+        if not path:
+            return QtGui.QIcon()
+
+        try:
+            return self._icons[path]
+        except KeyError:
+            pass
+
+        if not util.USE_THREADING:
+            self._on_decoded(path, QtGui.QImage(path), self._generation)
+            return self._icons[path]
+
+        if path not in self._pending:
+            self._pending.add(path)
+            self._queue.put((path, self._generation))
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._decode)
+                self._thread.daemon = True
+                self._thread.start()
+
+        return placeholder or QtGui.QIcon()
+
+    def clear(self):
+        """Evict all icons, e.g. on packages changing on disk"""
+        self._icons.clear()
+
+        # Decodes in flight are outdated, and are not to be cached
+        self._pending.clear()
+        self._generation += 1
+
+    def _decode(self):
+        # Unlike QPixmap, QImage is safe to use outside of the GUI thread
+        while True:
+            path, generation = self._queue.get()
+            self._decoded.emit(path, QtGui.QImage(path), generation)
+
+    def _on_decoded(self, path, image, generation):
+        if generation != self._generation:
+            return  # Cleared whilst decoding
+
+        self._pending.discard(path)
+
+        if image.isNull():
+            icon = QtGui.QIcon()
+        else:
+            icon = QtGui.QIcon(QtGui.QPixmap.fromImage(image))
+
+        self._icons[path] = icon
+        self.loaded.emit(path)
+
+
+def icon_cache():
+    """Return the process-wide IconCache, created on first use"""
+    if not _icon_cache:
+        _icon_cache.append(IconCache())
+    return _icon_cache[0]
+
+
 def load_themes():
     _themes.clear()
     for theme in default_themes() + allzparkconfig.themes():
@@ -0,0 +1,261 @@
+"""Capture package repositories, and replay them from memory
+
+Reproduce a production setup away from production, for benchmarks
+and regression tests. A snapshot holds what Allzpark reads from each
+package, along with how long each path took to list, and replays as
+a memory repository with that latency simulated.
+
+Usage:
+    $ python -m allzpark.snapshot capture snapshot.json.gz --latency
+    $ python -m allzpark.snapshot info snapshot.json.gz
+
+"""
+
+import sys
+import gzip
+import json
+import time
+import logging
+import argparse
+
+from . import _rezapi as rez
+
+log = logging.getLogger(__name__)
+
+# Increment on incompatible change to the format
+Version = 1
+
+# Package attributes read by Allzpark, and serialised as-is
+Attributes = (
+    "description",
+    "tools",
+    "relocatable",
+    "timestamp",
+    "_data",
+)
+
+
+def _package_data(package):
+    """Return JSON-compatible data of `package`"""
+    data = {
+        "name": package.name,
+        "version": str(package.version),
+        "requires": [str(req) for req in package.requires or []],
+    }
+
+    if package.variants:
+        data["variants"] = [
+            [str(req) for req in variant]
+            for variant in package.variants
+        ]
+
+    commands = getattr(package, "commands", None)
+    if commands is not None:
+        # Functions are kept as their source
+        data["commands"] = getattr(commands, "source", str(commands))
+
+    for attr in Attributes:
+        value = getattr(package, attr, None)
+        if value is not None:
+            data[attr] = value
+
+    return data
+
+
+def capture(fname, paths=None, families=None, latency=False):
+    """Write packages of `paths` to `fname`
+
+    Packages of all paths are merged, with those found first
+    taking precedence, as they would in a resolve.
+
+    Arguments:
+        fname (str): Destination, compressed if ending with .gz
+        paths (list, optional): Package paths, defaults to Rez's
+        families (list, optional): Names of families to capture,
+            defaults to all
+        latency (bool, optional): Time how long listing each family
+            takes per path, for replay
+
+    Returns:
+        dict: The snapshot written
+
+    """
+
+    paths = paths or rez.config.packages_path
+    packages = {}
+    timings = {}
+
+    for path in paths:
+        names = families
+        if names is None:
+            repository = rez.package_repository_manager.get_repository(path)
+            names = sorted(set(family.name for family in
+                               repository.iter_package_families()))
+
+        durations = []
+        for name in names:
+            t0 = time.time()
+            found = list(rez.find(name, paths=[path]))
+            durations.append(time.time() - t0)
+
+            versions = packages.setdefault(name, {})
+            for package in found:
+                version = str(package.version)
+                if version not in versions:
+                    versions[version] = _package_data(package)
+
+        timings[path] = {
+            "families": len(names),
+            "latency": (sum(durations) / len(durations)
+                        if latency and durations else 0.0),
+        }
+
+        log.info("Captured %d families from %s" % (len(names), path))
+
+    snapshot = {
+        "version": Version,
+        "captured": time.time(),
+        "paths": timings,
+        "packages": packages,
+    }
+
+    data = json.dumps(snapshot, default=str, sort_keys=True)
+
+    opener = gzip.open if fname.endswith(".gz") else open
+    with opener(fname, "wb") as f:
+        f.write(data.encode("utf-8"))
+
+    return snapshot
+
+
+def load(fname):
+    """Return snapshot written by `capture`"""
+    opener = gzip.open if fname.endswith(".gz") else open
+    with opener(fname, "rb") as f:
+        snapshot = json.loads(f.read().decode("utf-8"))
+
+    if snapshot.get("version") != Version:
+        raise ValueError("%s is of an unsupported version: %s"
+                         % (fname, snapshot.get("version")))
+
+    return snapshot
+
+
+def latency_of(snapshot):
+    """Return average seconds spent listing a family, across paths"""
+    latencies = [path["latency"] for path in snapshot["paths"].values()]
+    return sum(latencies) / len(latencies) if latencies else 0.0
+
+
+def simulate_latency(repository, latency):
+    """Delay each listing of a family or its packages by `latency`
+
+    Such as that of a network filesystem. Note that Rez caches
+    listings, such that the delay applies once per family until
+    its caches are cleared.
+
+    Arguments:
+        repository (PackageRepository): Repository, e.g. in memory
+        latency (float): Seconds, 0 removes any delay
+
+    """
+
+    methods = ("get_package_family", "iter_packages")
+
+    for method in methods:
+        repository.__dict__.pop(method, None)
+
+    if not latency:
+        return
+
+    def delayed(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(latency)
+            return func(*args, **kwargs)
+        return wrapper
+
+    for method in methods:
+        setattr(repository, method, delayed(getattr(repository, method)))
+
+
+def replay(snapshot, location="memory@any", latency=None):
+    """Serve packages of `snapshot` from a memory repository
+
+    Arguments:
+        snapshot (dict or str): Snapshot, or path to one
+        location (str, optional): Package path to serve from
+        latency (float, optional): Seconds per listing, defaults
+            to what was captured, if anything
+
+    Returns:
+        PackageRepository: The memory repository
+
+    """
+
+    if not isinstance(snapshot, dict):
+        snapshot = load(snapshot)
+
+    if latency is None:
+        latency = latency_of(snapshot)
+
+    repository = rez.package_repository_manager.get_repository(location)
+    repository.data = snapshot["packages"]
+    repository.clear_caches()
+    simulate_latency(repository, latency)
+
+    return repository
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser("allzpark.snapshot", description=(
+        "Capture package repositories for replay in tests and benchmarks"
+    ))
+
+    commands = parser.add_subparsers(dest="command")
+
+    parser_capture = commands.add_parser("capture", help=(
+        "Write packages of each package path to a file"))
+    parser_capture.add_argument("fname", help=(
+        "Destination, compressed if ending with .gz"))
+    parser_capture.add_argument("--path", action="append", help=(
+        "Capture this package path, defaults to REZ_PACKAGES_PATH. "
+        "May be passed more than once"))
+    parser_capture.add_argument("--family", action="append", help=(
+        "Capture this family only, defaults to all. "
+        "May be passed more than once"))
+    parser_capture.add_argument("--latency", action="store_true", help=(
+        "Record how long listing families takes, for replay"))
+
+    parser_info = commands.add_parser("info", help=(
+        "Summarise contents of a snapshot"))
+    parser_info.add_argument("fname")
+
+    opts = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if opts.command == "capture":
+        snapshot = capture(opts.fname,
+                           paths=opts.path,
+                           families=opts.family,
+                           latency=opts.latency)
+
+    elif opts.command == "info":
+        snapshot = load(opts.fname)
+
+    else:
+        parser.print_help()
+        return 1
+
+    packages = snapshot["packages"]
+    sys.stdout.write("%d families, %d packages\n" % (
+        len(packages), sum(len(versions) for versions in packages.values())))
+
+    for path, timing in snapshot["paths"].items():
+        sys.stdout.write("%s: %d families, %.3fs per listing\n" % (
+            path, timing["families"], timing["latency"]))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import os
 import re
+import sys
 import time
+import tempfile
 import traceback
 import functools
 import contextlib
@@ -13,6 +15,9 @@ from .vendor import six
 from .vendor.Qt import QtCore
 
 _lru_cache = {}
+_interned = {}
+_segments = {}
+_intern_stats = {"calls": 0, "hits": 0, "saved": 0, "size": 0}
 _threads = []
 _basestring = six.string_types[0]  # For Python 2/3
 _log = logging.getLogger(__name__)
@@ -77,6 +82,84 @@ def cached(func):
     return wrapper
 
 
+def intern_string(value):
+    """Return the one copy of `value` shared amongst all callers
+
+    Strings equal in content are kept once, e.g. a PATH entry common
+    to every context of a profile, until `clear_interned` is called.
+
+    """
+
+    _intern_stats["calls"] += 1
+
+    try:
+        shared = _interned[value]
+
+    except KeyError:
+        _interned[value] = value
+        _intern_stats["size"] += sys.getsizeof(value)
+        return value
+
+    if shared is not value:
+        _intern_stats["hits"] += 1
+        _intern_stats["saved"] += sys.getsizeof(value)
+
+    return shared
+
+
+def intern_segments(value):
+    """Return PATH-like `value` split into its shared segments
+
+    The split is kept alongside the value, such that every context
+    and model with an equal value shares one tuple of segments.
+
+    """
+
+    try:
+        return _segments[value]
+
+    except KeyError:
+        segments = tuple(intern_string(segment)
+                         for segment in value.split(os.pathsep))
+        _segments[intern_string(value)] = segments
+        return segments
+
+
+def intern_environ(environ):
+    """Return copy of `environ` with keys, values and segments shared
+
+    Segments of PATH-like values are shared too, for when they are
+    split for viewing, see `model.LazyJsonItem`.
+
+    """
+
+    shared = {}
+
+    for key, value in environ.items():
+        if isinstance(value, _basestring):
+            value = intern_string(value)
+
+            if os.pathsep in value:
+                intern_segments(value)
+
+        shared[intern_string(key)] = value
+
+    return shared
+
+
+def intern_stats():
+    """Return number of calls, hits and bytes saved by interning"""
+    return dict(_intern_stats,
+                interned=len(_interned),
+                segmented=len(_segments))
+
+
+def clear_interned():
+    _interned.clear()
+    _segments.clear()
+    _intern_stats["size"] = 0
+
+
 def windows_taskbar_compat():
     """Enable icon and taskbar grouping for Windows 7+"""
 
@@ -189,6 +272,37 @@ def open_file_location(fname):
         raise OSError("%s did not exist" % fname)
 
 
+@contextlib.contextmanager
+def atomic_write(fname):
+    """Write `fname` via a temporary file, yielding its path
+
+    Readers, such as other instances of Allzpark, never see a partially
+    written file. Should another process write `fname` in the meantime,
+    its copy is replaced where the platform allows and kept otherwise.
+
+    """
+
+    root, ext = os.path.splitext(fname)
+    fd, temp = tempfile.mkstemp(prefix=os.path.basename(root) + "-",
+                                suffix=ext,
+                                dir=os.path.dirname(fname))
+    os.close(fd)
+
+    try:
+        yield temp
+
+        try:
+            os.rename(temp, fname)
+        except OSError:
+            # Windows does not replace existing files
+            if not os.path.exists(fname):
+                raise
+
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
 def normpath(path):
     return os.path.normpath(
         os.path.normcase(os.path.abspath(path)).replace("\\", "/")
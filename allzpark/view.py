@@ -42,8 +42,16 @@ class Applications(dock.SlimTableView):
         delegate.editor_closed.connect(self.on_editor_done)
         ctrl.resetted.connect(lambda: self.on_editor_done(False))
 
+        # Apps listed before being resolved are resolved on hover
+        self.setMouseTracking(True)
+        self.entered.connect(self.on_entered)
+
+        self._ctrl = ctrl
         self._selected_app_ok = False
 
+    def on_entered(self, index):
+        self._ctrl.prefetch_application(index.model().data(index, "name"))
+
     def on_editor_created(self):
         self.selectionModel().blockSignals(True)
 
@@ -127,6 +135,7 @@ class Window(QtWidgets.QMainWindow):
             ("environment", dock.Environment(ctrl)),
             ("console", dock.Console()),
             ("commands", dock.Commands()),
+            ("diagnostics", dock.Diagnostics(self, ctrl)),
             ("preferences", dock.Preferences(self, ctrl)),
         ))
 
@@ -499,16 +508,23 @@ class Window(QtWidgets.QMainWindow):
             self.update_advanced_controls()
 
         if key in ("showAllApps",
+                   "resolveOnDemand",
                    "showHiddenApps",
                    "patchWithFilter"):
-            self._ctrl.reset()
+            self._ctrl.reset(clear_caches=False)
+
+        if key == "memoryProfiling":
+            if value:
+                self._ctrl.memory.start()
+            else:
+                self._ctrl.memory.stop()
 
         if key == "showAllVersions":
             self._ctrl.select_application(self._ctrl.state["appRequest"])
 
         if key == "exclusionFilter":
             allzparkconfig.exclude_filter = value
-            self._ctrl.reset()
+            self._ctrl.reset(clear_caches=False)
 
         if key == "theme":
             user_css = self._ctrl.state.retrieve("userCss", "")
@@ -603,7 +619,7 @@ class Window(QtWidgets.QMainWindow):
         label = profile
 
         package = self._ctrl.state["rezProfiles"][profile][version]
-        data = allzparkconfig.metadata_from_package(package)
+        data = model.metadata_from_package(package)
         label = data["label"]
 
         # Facilitate overriding of icon via package metadata
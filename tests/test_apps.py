@@ -104,6 +104,48 @@ class TestApps(util.TestBase):
         self.assertIn("THIS_B", env["app_B==1.0.0"])
         self.assertNotIn("THIS_B", env["app_A==1.0.0"])
 
+    def test_app_environ_interned(self):
+        """Test environment common to apps is kept once"""
+        from allzpark import util as azutil
+
+        util.memory_repository({
+            "foo": {
+                "1": {
+                    "name": "foo",
+                    "version": "1",
+                    "requires": ["~app_A", "~app_B"],
+                    "commands": "\n".join([
+                        "env.FOO='BAR'",
+                        "env.SHARED_PATH.append('/shared/a')",
+                        "env.SHARED_PATH.append('/shared/b')",
+                    ])
+                }
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        env_A = self.ctrl.environ("app_A==1")
+        env_B = self.ctrl.environ("app_B==1")
+
+        self.assertIsNot(env_A, env_B)
+        self.assertIs(env_A["FOO"], env_B["FOO"])
+        self.assertIs(env_A["SHARED_PATH"], env_B["SHARED_PATH"])
+
+        # Segments are split once, and shared too
+        segments = azutil.intern_segments(env_A["SHARED_PATH"])
+        self.assertIs(segments, azutil.intern_segments(env_B["SHARED_PATH"]))
+        self.assertEqual(("/shared/a", "/shared/b"), segments[-2:])
+
+        stats = azutil.intern_stats()
+        self.assertGreater(stats["hits"], 0)
+        self.assertGreater(stats["segmented"], 0)
+        self.assertGreater(stats["size"], 0)
+
+        azutil.clear_interned()
+        self.assertEqual(0, azutil.intern_stats()["size"])
+
     def test_app_failed_independently_1(self):
         """Test app resolve failure doesn't fail whole profile"""
         util.memory_repository({
@@ -361,3 +403,675 @@ class TestApps(util.TestBase):
         resolved_pkgs = [p for p in context_a.resolved_packages
                          if "app_A" == p.name and "1.0.0" == str(p.version)]
         self.assertEqual(1, len(resolved_pkgs))
+
+    def test_app_metadata_cached(self):
+        """Test package metadata is queried once per package"""
+        from allzpark import allzparkconfig
+
+        util.memory_repository({
+            "foo": {
+                "1": {"name": "foo", "version": "1",
+                      "requires": ["~app_A", "~app_B"]},
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+        })
+
+        calls = list()
+        original = allzparkconfig.metadata_from_package
+
+        def metadata_from_package(variant):
+            calls.append(variant.qualified_name)
+            return original(variant)
+
+        self.patch_allzparkconfig("metadata_from_package",
+                                  metadata_from_package)
+        self.ctrl_reset(["foo"])
+
+        self.select_application("app_A==1")
+        self.select_application("app_B==1")
+        self.select_application("app_A==1")
+
+        # Applications and the profile. Apps other than the startup app
+        # are listed by package until resolved, sharing one entry with
+        # the variant they resolve into
+        self.assertEqual(
+            ["app_A-1", "app_B-1", "foo-1"],
+            sorted(name.split("[", 1)[0] for name in calls),
+            "Metadata queried more than once: %s" % calls
+        )
+
+    def test_app_usage_order(self):
+        """Test apps are resolved by usage, but listed in profile order"""
+        util.memory_repository({
+            "foo": {
+                "1": {"name": "foo", "version": "1",
+                      "requires": ["~app_A", "~app_B", "~app_C"]},
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+            "app_C": {"1": {"name": "app_C", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        self.ctrl.state["appRequest"] = "app_B==1"
+        self.ctrl.record_launch("app_C==1")
+
+        self.assertEqual(
+            ["app_B", "app_C", "app_A"],
+            self.ctrl.usage_order(["app_A", "app_B", "app_C"])
+        )
+        apps = self.ctrl.models["apps"]
+        self.assertEqual(
+            ["app_A==1", "app_B==1", "app_C==1"],
+            [item["name"] for item in apps.items]
+        )
+
+    def test_apps_resolved_progressively(self):
+        """Test apps are selectable before all are resolved, by usage"""
+        util.memory_repository({
+            "foo": {
+                "1": {"name": "foo", "version": "1",
+                      "requires": ["~app_A", "~app_B", "~app_C"]},
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+            "app_C": {"1": {"name": "app_C", "version": "1"}},
+        })
+
+        self.ctrl.state["appRequest"] = "app_B==1"
+        self.ctrl.record_launch("app_C==1")
+
+        resolved = []
+        self.ctrl.application_resolved.connect(resolved.append)
+        self.ctrl_reset(["foo"])
+
+        # Startup app up-front, the rest as each resolves
+        self.assertEqual(["app_C==1", "app_A==1"], resolved)
+        self.assertEqual(
+            ["app_A==1", "app_B==1", "app_C==1"],
+            sorted(self.ctrl.state["rezContexts"])
+        )
+
+    def test_launch_history_corrupt(self):
+        """Test corrupt entries of the launch history are skipped"""
+        import json
+
+        self.ctrl.state.store("launchHistory", json.dumps({
+            "app_A": "corrupt",
+            "app_B": [1],
+            "app_C": [2, 1000.0],
+        }))
+
+        self.ctrl.record_launch("app_A==1")
+        history = self.ctrl.launch_history()
+
+        self.assertEqual(["app_A", "app_C"], sorted(history))
+        self.assertEqual(1, history["app_A"][0])
+        self.assertEqual([2, 1000.0], history["app_C"])
+
+    def test_find_versions(self):
+        """Test versions of many families are found and cached"""
+        from unittest import mock
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "bar": {
+                "1": {"name": "bar", "version": "1"},
+                "10": {"name": "bar", "version": "10"},
+                "2": {"name": "bar", "version": "2"},
+            },
+            "baz": {"1": {"name": "baz", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        versions = self.ctrl.find_versions(["bar", "baz"])
+        self.assertEqual({"bar": ["1", "2", "10"], "baz": ["1"]}, versions)
+
+        with mock.patch.object(self.ctrl, "find") as find:
+            self.assertEqual(versions, self.ctrl.find_versions(["bar", "baz"]))
+            find.assert_not_called()
+
+    def test_find_sorted_by_version(self):
+        """Test packages are found in order of Rez version"""
+        from allzpark import _rezapi as rez
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "bar": {
+                version: {"name": "bar", "version": version}
+                for version in ("1.10", "1.9", "1.0.1", "1.0")
+            },
+        })
+        self.ctrl_reset(["foo"])
+
+        self.assertEqual(
+            ["1.0", "1.0.1", "1.9", "1.10"],
+            [str(pkg.version) for pkg in self.ctrl.find("bar")]
+        )
+        self.assertEqual(
+            "1.10",
+            str(rez.find_latest("bar", paths=[util.MEMORY_LOCATION]).version)
+        )
+
+    def test_find_latest_of_equal_versions(self):
+        """Test the later of packages of equal version is the latest"""
+        from unittest import mock
+        from allzpark import _rezapi as rez
+        from rez.vendor.version.version import Version
+
+        class Package(object):
+            def __init__(self, version):
+                self.version = Version(version)
+
+        packages = [Package("2"), Package("1"), Package("2"), Package("1.5")]
+
+        with mock.patch.object(rez, "find", return_value=iter(packages)):
+            self.assertIs(packages[2], rez.find_latest("bar"))
+
+        with mock.patch.object(rez, "find", return_value=iter([])):
+            with self.assertRaises(rez.PackageNotFoundError):
+                rez.find_latest("bar")
+
+    def test_resolve_many_full_solve(self):
+        """Test resolving on top of a profile matches a full resolve"""
+        from allzpark import _rezapi as rez
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["python", "~app_A"]}},
+            "python": {
+                "2": {"name": "python", "version": "2"},
+                "3": {"name": "python", "version": "3"},
+            },
+            "tool": {
+                "1": {"name": "tool", "version": "1",
+                      "requires": ["python-3"]},
+                "2": {"name": "tool", "version": "2",
+                      "requires": ["python-2"]},
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        paths = self.ctrl._package_paths()
+        base, contexts, stats = rez.resolve_many(
+            ["foo-1"], [["tool"], ["app_A"]], package_paths=paths
+        )
+
+        self.assertTrue(base.success)
+        self.assertEqual(2, stats["resolves"])
+
+        for request, context in zip([["tool"], ["app_A"]], contexts):
+            full = rez.env(["foo-1"] + request, package_paths=paths)
+
+            self.assertEqual(
+                ["foo-1"] + request,
+                [str(req) for req in context.requested_packages()]
+            )
+            self.assertEqual(
+                [pkg.qualified_name for pkg in full.resolved_packages],
+                [pkg.qualified_name for pkg in context.resolved_packages]
+            )
+
+        # A solve of the profile is reused rather than solved again
+        _, _, stats = rez.resolve_many(
+            ["foo-1"], [["app_A"]], package_paths=paths, base_context=base
+        )
+        self.assertTrue(stats["baseReused"])
+        self.assertEqual(base.solve_time, stats["savedTime"])
+        self.assertGreater(stats["savedTime"], 0)
+
+    def test_resolve_pool(self):
+        """Test resolving in worker processes, which share no memory"""
+        import os
+        import shutil
+        import tempfile
+        from allzpark import _rezapi as rez
+
+        # Workers only see packages on disk
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        for version in ("1", "2"):
+            root = os.path.join(tempdir, "foo", version)
+            os.makedirs(root)
+
+            with open(os.path.join(root, "package.py"), "w") as f:
+                f.write("name = 'foo'\nversion = '%s'\n" % version)
+
+        pool = rez.ResolvePool(1)
+        self.addCleanup(pool.close)
+
+        package_filter = rez.PackageFilterList.from_pod([
+            {"excludes": ["foo-2"]}
+        ])
+
+        context, missing = pool.env_many([["foo"], ["bar"]],
+                                         package_paths=[tempdir],
+                                         package_filter=package_filter)
+
+        self.assertTrue(context.success)
+        self.assertEqual(["foo-1"], [pkg.qualified_package_name
+                                     for pkg in context.resolved_packages])
+        self.assertIsInstance(missing, Exception)
+
+    def test_resolve_pool_shared(self):
+        """Test one resolve pool serves every resolve, if enabled"""
+        from unittest import mock
+        from allzpark import _rezapi as rez
+
+        self.assertIsNone(self.ctrl.resolve_pool())
+
+        self.patch_allzparkconfig("resolve_processes", 2)
+
+        with mock.patch.object(rez, "ResolvePool") as ResolvePool:
+            pool = self.ctrl.resolve_pool()
+            self.assertIs(pool, self.ctrl.resolve_pool())
+
+        ResolvePool.assert_called_once_with(2)
+
+    def _test_patch_repository(self):
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A", "~app_B"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1",
+                            "requires": ["lib"]}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+            "lib": {"1": {"name": "lib", "version": "1"},
+                    "2": {"name": "lib", "version": "2"}},
+        })
+        self.ctrl_reset(["foo"])
+
+    def test_patch_affected_only(self):
+        """Test patching re-resolves only contexts including the family"""
+        self._test_patch_repository()
+
+        contexts = self.ctrl.state["rezContexts"]
+        context_b = contexts["app_B==1"]
+
+        with self.wait_signal(self.ctrl.state_changed, "ready"):
+            self.ctrl.patch("lib-1")
+
+        contexts = self.ctrl.state["rezContexts"]
+        self.assertEqual(["app_A==1", "app_B==1"], list(contexts))
+        self.assertIs(context_b, contexts["app_B==1"])
+        self.assertIn("lib-1", [pkg.qualified_package_name for pkg in
+                                contexts["app_A==1"].resolved_packages])
+
+    def test_patch_merged_into_live_state(self):
+        """Test apps resolved whilst patching are kept"""
+        from unittest import mock
+
+        self._test_patch_repository()
+
+        original = self.ctrl._patch_context
+        state = self.ctrl.state
+
+        def _patch_context(*args):
+            # As though resolved by _resolve_app meanwhile
+            state["rezContexts"]["app_C==1"] = state["rezContexts"]["app_B==1"]
+            state["appSources"]["app_C==1"] = state["appSources"]["app_B==1"]
+            return original(*args)
+
+        with mock.patch.object(self.ctrl, "_patch_context", _patch_context):
+            with self.wait_signal(self.ctrl.state_changed, "ready"):
+                self.ctrl.patch("lib-1")
+
+        self.assertEqual(["app_A==1", "app_B==1", "app_C==1"],
+                         list(state["rezContexts"]))
+        self.assertEqual(["app_A==1", "app_B==1", "app_C==1"],
+                         list(state["appSources"]))
+
+    def test_patch_whilst_resolving(self):
+        """Test an app resolving whilst patching is kept, and patched"""
+        import threading
+        from unittest import mock
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1",
+                            "requires": ["lib"]}},
+            "app_C": {"1": {"name": "app_C", "version": "1",
+                            "requires": ["lib"]}},
+            "lib": {"1": {"name": "lib", "version": "1"},
+                    "2": {"name": "lib", "version": "2"}},
+        })
+        self.patch_allzparkconfig("applications", ["app_A", "app_C"])
+        self.ctrl._resolver._idle = 60  # Left to resolve on demand
+        self.ctrl.state.store("showAllApps", True)
+        self.ctrl.state.store("resolveOnDemand", True)
+        self.ctrl_reset(["foo"])
+
+        state = self.ctrl.state
+        original = self.ctrl._patch_context
+        entered = threading.Event()
+        release = threading.Event()
+
+        def _patch_context(app_package, *args, **kwargs):
+            if app_package.name == "app_C" and not entered.is_set():
+                # Resolved, but not yet stored
+                entered.set()
+                release.wait(5)
+            return original(app_package, *args, **kwargs)
+
+        with mock.patch.object(self.ctrl, "_patch_context", _patch_context):
+            worker = threading.Thread(target=self.ctrl._resolve_app,
+                                      args=["app_C==1"])
+            worker.start()
+            self.assertTrue(entered.wait(5))
+
+            with self.wait_signal(self.ctrl.state_changed, "ready"):
+                self.ctrl.patch("lib-1")
+
+            # Still listed, until stored
+            self.assertIn("app_C==1", state["unresolvedApps"])
+            self.assertIn("app_C==1", state["rezApps"])
+
+            release.set()
+            worker.join(5)
+
+        self.assertNotIn("app_C==1", state["unresolvedApps"])
+        self.assertEqual(["app_A==1", "app_C==1"], list(state["rezContexts"]))
+
+        for app_request in ("app_A==1", "app_C==1"):
+            context = state["rezContexts"][app_request]
+            self.assertIn("lib-1", [pkg.qualified_package_name
+                                    for pkg in context.resolved_packages])
+
+    def test_resolve_cache_settings_at_resolve(self):
+        """Test contexts are cached relative what they were resolved with"""
+        from unittest import mock
+        from allzpark import control
+
+        self._test_patch_repository()
+
+        paths = self.ctrl._package_paths()
+        changed = []
+        original = control.rez.env
+
+        def env(*args, **kwargs):
+            # Preferences changed whilst resolving
+            changed.append(True)
+            return original(*args, **kwargs)
+
+        def _package_paths():
+            return paths + ["/changed"] if changed else paths
+
+        with mock.patch.object(control.rez, "env", env), \
+                mock.patch.object(self.ctrl, "_package_paths",
+                                  _package_paths):
+            self.ctrl.env(["app_B"])
+
+        entries = self.ctrl.state["resolveCache"][(("app_B",), True)]
+        self.assertEqual([tuple(paths)],
+                         [settings[0] for settings, _, _ in entries])
+
+    def test_resolve_cache_flip_back(self):
+        """Test flipping a preference and flipping it back hits the cache"""
+        from unittest import mock
+        from allzpark import control
+
+        self._test_patch_repository()
+        context = self.ctrl.env(["app_A"])
+
+        self.patch_allzparkconfig("exclude_filter", "lib-2")
+        excluded = self.ctrl.env(["app_A"])
+        self.assertIsNot(context, excluded)
+
+        self.patch_allzparkconfig("exclude_filter", None)
+
+        with mock.patch.object(control.rez, "env") as env:
+            self.assertIs(context, self.ctrl.env(["app_A"]))
+
+            self.patch_allzparkconfig("exclude_filter", "lib-2")
+            self.assertIs(excluded, self.ctrl.env(["app_A"]))
+
+        env.assert_not_called()
+
+    def test_resolve_cache_variant_requires(self):
+        """Test contexts are resolved anew once variant requirements change"""
+        from unittest import mock
+        from allzpark import control
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~tool"]}},
+            "tool": {"1": {"name": "tool", "version": "1",
+                           "variants": [["dev_lib"], ["lib"]]}},
+            "dev_lib": {"1": {"name": "dev_lib", "version": "1"}},
+            "lib": {"1": {"name": "lib", "version": "1"}},
+            "other": {"1": {"name": "other", "version": "1"}},
+        })
+        self.patch_allzparkconfig("exclude_filter", "dev_lib")
+        self.ctrl_reset(["foo"])
+
+        context = self.ctrl.env(["tool"])
+        self.assertNotIn("dev_lib", [pkg.name
+                                     for pkg in context.resolved_packages])
+
+        with mock.patch.object(control.rez, "env",
+                               wraps=control.rez.env) as env:
+
+            # As though development packages were enabled
+            self.patch_allzparkconfig("exclude_filter", None)
+            self.ctrl.env(["tool"])
+            self.assertEqual(1, env.call_count)
+
+            # Whereas families none of its variants require are unrelated
+            self.patch_allzparkconfig("exclude_filter", "other")
+            self.ctrl.env(["tool"])
+            self.assertEqual(1, env.call_count)
+
+    def test_resolve_cache_bounded(self):
+        """Test only the most recently used contexts are cached"""
+        from unittest import mock
+        from allzpark import control
+
+        self._test_patch_repository()
+        cache = self.ctrl.state["resolveCache"]
+
+        with mock.patch.object(control, "MaxResolveCache", 2):
+            self.ctrl.env(["lib-1"])
+            self.ctrl.env(["lib-2"])
+            self.ctrl.env(["lib-1"])  # Used again
+            self.ctrl.env(["app_B"])
+
+            self.assertEqual([(("lib-1",), True), (("app_B",), True)],
+                             list(cache)[-2:])
+            self.assertEqual(2, len(cache))
+
+    def test_compact_context(self):
+        """Test contexts keep only requested packages in full"""
+        from unittest import mock
+        from allzpark import model
+
+        self._test_patch_repository()
+
+        with mock.patch.object(model, "MaxHydrated", 1):
+            context = self.ctrl.env(["app_A"])
+            expected = context.to_dict()
+
+            packages = {pkg.name: pkg for pkg in context.resolved_packages}
+            app, lib = packages["app_A"], packages["lib"]
+            self.assertNotIsInstance(app, model.CompactPackage)
+            self.assertIsInstance(lib, model.CompactPackage)
+            self.assertEqual("2", str(lib.version))
+
+            # Not compressed until another context is used
+            self.assertTrue(context.hydrated)
+            self.assertEqual(0, context.nbytes)
+
+            self.ctrl.env(["app_B"])
+
+            self.assertFalse(context.hydrated)
+            self.assertGreater(context.nbytes, 0)
+            self.assertEqual(expected, context.to_dict())
+
+            # Anything but its name and version rehydrates
+            self.assertEqual(["lib"], [lib.name])
+            self.assertFalse(context.hydrated)
+            self.assertEqual([], lib.requires or [])
+            self.assertTrue(context.hydrated)
+
+    def test_failure_remembered(self):
+        """Test failed resolves are remembered until packages change"""
+        from unittest import mock
+        from allzpark import control, _rezapi
+
+        self._test_patch_repository()
+
+        with self.assertRaises(_rezapi.PackageFamilyNotFoundError):
+            self.ctrl.env(["missing"])
+
+        with mock.patch.object(control.rez, "env") as env:
+            with self.assertRaises(_rezapi.PackageFamilyNotFoundError):
+                self.ctrl.env(["missing"])
+
+        self.assertFalse(env.called)
+        self.assertTrue(self.ctrl.state["rezFailures"])
+
+        with self.wait_signal(self.ctrl.resetted):
+            self.ctrl.repository_changed.emit()
+
+        self.assertFalse(self.ctrl.state["rezFailures"])
+
+    def test_failure_expired(self):
+        """Test failed resolves are tried again once expired"""
+        from unittest import mock
+        from allzpark import control, _rezapi
+
+        self._test_patch_repository()
+        self.patch_allzparkconfig("failure_ttl", -1)
+
+        with self.assertRaises(_rezapi.PackageFamilyNotFoundError):
+            self.ctrl.env(["missing"])
+
+        with mock.patch.object(control.rez, "env",
+                               side_effect=_rezapi.PackageFamilyNotFoundError(
+                                   "missing")) as env:
+            with self.assertRaises(_rezapi.PackageFamilyNotFoundError):
+                self.ctrl.env(["missing"])
+
+        self.assertTrue(env.called)
+
+    def test_resolve_on_demand(self):
+        """Test apps are resolved as they are selected, if on demand"""
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+            "app_C": {"1": {"name": "app_C", "version": "1"}},
+        })
+        self.patch_allzparkconfig("applications",
+                                  ["app_A", "app_B", "app_C"])
+        self.ctrl._resolver._idle = 60  # Left to resolve on demand
+        self.ctrl.state.store("showAllApps", True)
+        self.ctrl.state.store("resolveOnDemand", True)
+
+        resolved = []
+        self.ctrl.application_resolved.connect(resolved.append)
+        self.ctrl_reset(["foo"])
+
+        # Listed up-front, with only the first resolved
+        apps = self.ctrl.models["apps"]
+        self.assertEqual(["app_A==1", "app_B==1", "app_C==1"],
+                         [item["name"] for item in apps.items])
+        self.assertEqual(["app_A==1"], list(self.ctrl.state["rezContexts"]))
+        self.assertEqual(["app_B==1", "app_C==1"],
+                         list(self.ctrl.state["unresolvedApps"]))
+
+        with self.wait_signal(self.ctrl.application_changed):
+            self.select_application("app_C==1")
+
+        self.assertEqual(["app_C==1"], resolved)
+        self.assertEqual("app_C==1", self.ctrl.state["appRequest"])
+        self.assertEqual(["app_B==1"], list(self.ctrl.state["unresolvedApps"]))
+        self.assertTrue(apps.find("app_C==1")["resolved"])
+        self.assertFalse(apps.find("app_B==1").get("resolved"))
+
+        # Resolved in the background, e.g. on hover
+        with self.wait_signal(self.ctrl.application_resolved):
+            self.ctrl.prefetch_application("app_B==1")
+
+        self.assertFalse(self.ctrl.state["unresolvedApps"])
+        self.assertIn("app_B==1", self.ctrl.state["rezContexts"])
+
+    def test_resolve_whilst_idle(self):
+        """Test apps resolved on demand are otherwise resolved whilst idle"""
+        from allzpark.vendor.Qt import QtCore, QtGui
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+        })
+        self.patch_allzparkconfig("applications", ["app_A", "app_B"])
+        self.ctrl._resolver._idle = 60
+        self.ctrl.state.store("showAllApps", True)
+        self.ctrl.state.store("resolveOnDemand", True)
+
+        # Input of the user is tracked once, for every kind of idle
+        self.assertIs(self.ctrl._prewarmer._monitor,
+                      self.ctrl._resolver._monitor)
+
+        def busy():
+            event = QtGui.QKeyEvent(QtCore.QEvent.KeyPress,
+                                    QtCore.Qt.Key_Shift,
+                                    QtCore.Qt.NoModifier)
+            QtCore.QCoreApplication.sendEvent(self.window, event)
+
+        self.ctrl_reset(["foo"])
+        self.assertEqual(["app_B==1"], list(self.ctrl.state["unresolvedApps"]))
+
+        busy()
+        self.ctrl._resolver._idle = 0.3
+        self.wait(100)
+        self.assertEqual(["app_B==1"], list(self.ctrl.state["unresolvedApps"]))
+
+        with self.wait_signal(self.ctrl.application_resolved, timeout=2000):
+            pass
+
+        self.assertFalse(self.ctrl.state["unresolvedApps"])
+        self.assertIn("app_B==1", self.ctrl.state["rezContexts"])
+
+    def test_resolve_on_demand_patched(self):
+        """Test apps resolved on demand are listed as patched"""
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"},
+                      "2": {"name": "app_B", "version": "2"}},
+        })
+        self.patch_allzparkconfig("applications", ["app_A", "app_B"])
+        self.ctrl._resolver._idle = 60  # Left to resolve on demand
+        self.ctrl.state.store("showAllApps", True)
+        self.ctrl.state.store("resolveOnDemand", True)
+        self.ctrl.state.store("patch", "app_B-1")
+        self.ctrl_reset(["foo"])
+
+        self.assertEqual(["app_B==2"], list(self.ctrl.state["unresolvedApps"]))
+
+        with self.wait_signal(self.ctrl.application_changed):
+            self.select_application("app_B==2")
+
+        # As it would have been, had it been resolved up-front
+        self.assertEqual("app_B==1", self.ctrl.state["appRequest"])
+        self.assertEqual(["app_A==1", "app_B==1"],
+                         list(self.ctrl.state["rezContexts"]))
+        self.assertEqual(["app_A==1", "app_B==1"],
+                         list(self.ctrl.state["rezApps"]))
+
+        apps = self.ctrl.models["apps"]
+        self.assertEqual(["app_A==1", "app_B==1"],
+                         [item["name"] for item in apps.items])
+        self.assertTrue(apps.find("app_B==1")["resolved"])
+        self.assertEqual("1", apps.find("app_B==1")["version"])
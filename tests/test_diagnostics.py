@@ -0,0 +1,304 @@
+import time
+from tests import util
+
+
+class TestDiagnostics(util.TestBase):
+
+    def test_watchdog_stall(self):
+        """Test stalls of the GUI thread are captured per operation"""
+        from allzpark import diagnostics
+
+        watchdog = diagnostics.Watchdog(threshold=0.2, interval=20)
+        self.addCleanup(watchdog.stop)
+
+        watchdog.start()
+        self.assertTrue(watchdog.is_running())
+        self.wait(100)
+
+        self.assertEqual({}, watchdog.stalls())
+
+        def stall():
+            time.sleep(0.6)
+
+        with self.assertLogs("allzpark.diagnostics", "WARNING") as logs:
+            diagnostics.profiled(stall, "stall")()
+            self.wait(100)  # Beat, now that the GUI thread is back
+
+        self.assertIn("GUI stalled", logs.output[0])
+        self.assertIn("in stall", logs.output[0])  # Its stack
+        self.assertIn("GUI resumed", logs.output[-1])
+
+        stalls = watchdog.stalls()
+        self.assertEqual(1, len(stalls))
+
+        op, stats = stalls.popitem()
+        self.assertEqual(1, stats["count"])
+        self.assertGreaterEqual(stats["max"], 0.6)
+        self.assertEqual([1, 0, 0, 0, 0, 0], stats["buckets"])
+        self.assertIn(op, watchdog.report())
+
+    def test_watchdog_off(self):
+        """Test no threshold leaves the watchdog off"""
+        from allzpark import diagnostics
+
+        watchdog = diagnostics.Watchdog(threshold=0)
+        watchdog.start()
+
+        self.assertFalse(watchdog.is_running())
+        self.assertIn("Watchdog is off", watchdog.report())
+
+    def test_watchdog_restart(self):
+        """Test the watchdog stops its thread and may be started again"""
+        from allzpark import diagnostics
+
+        watchdog = diagnostics.Watchdog(threshold=0.2, interval=20)
+        self.addCleanup(watchdog.stop)
+
+        watchdog.start()
+        thread = watchdog._thread
+        watchdog.stop()
+
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(watchdog.is_running())
+
+        watchdog.start()
+        self.assertTrue(watchdog.is_running())
+        self.assertIsNot(thread, watchdog._thread)
+        self.assertTrue(watchdog._thread.is_alive())
+
+        # Stopping the first run did not stop the second
+        self.wait(100)
+        self.assertTrue(watchdog._thread.is_alive())
+
+    def test_patch_profiled(self):
+        """Test patching is profiled, along with its work in a thread"""
+        import glob
+        import shutil
+        import tempfile
+        from allzpark import diagnostics
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1",
+                            "requires": ["lib"]}},
+            "lib": {"1": {"name": "lib", "version": "1"},
+                    "2": {"name": "lib", "version": "2"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.addCleanup(diagnostics.ops.stop)
+
+        diagnostics.ops.start(root)
+
+        with self.wait_signal(self.ctrl.state_changed, "ready"):
+            self.ctrl.patch("lib-1")
+
+        diagnostics.ops.stop()
+
+        self.assertEqual(1, len(glob.glob(root + "/*-patch-*.pstats")))
+        self.assertEqual(1, len(glob.glob(root + "/*-patch.do-*.pstats")))
+
+    def test_profile_operations_menu(self):
+        """Test profiling is toggled from the advanced menu of the window"""
+        from allzpark import dock
+
+        profiles = self.window._docks["profiles"]
+
+        def actions():
+            profiles.on_context_menu(self.window)()
+            menu = self.window.findChildren(dock.MenuWithTooltip)[-1]
+            menu.close()
+            return {action.text(): action for action in menu.actions()}
+
+        self.set_preference("showAdvancedControls", False)
+        self.assertNotIn("Profile operations", actions())
+
+        self.set_preference("showAdvancedControls", True)
+        self.addCleanup(self.ctrl.profile_operations, False)
+
+        action = actions()["Profile operations"]
+        self.assertFalse(action.isChecked())
+
+        action.setChecked(True)
+        self.assertTrue(actions()["Profile operations"].isChecked())
+
+    def test_sampler(self):
+        """Test stacks of every thread are sampled and exported"""
+        import os
+        import json
+        import shutil
+        import threading
+        import tempfile
+        from allzpark import diagnostics
+
+        sampler = diagnostics.Sampler(rate=200)
+        self.addCleanup(sampler.stop)
+
+        stopped = threading.Event()
+
+        def busy():
+            while not stopped.wait(0.001):
+                pass
+
+        worker = threading.Thread(target=busy, name="busyWorker")
+        worker.start()
+
+        sampler.start()
+        self.assertTrue(sampler.is_running())
+        time.sleep(0.3)
+
+        thread = sampler._thread
+        sampler.stop()
+        self.assertFalse(thread.is_alive())
+
+        stopped.set()
+        worker.join()
+
+        # No more samples once stopped
+        stacks = sampler.stacks()
+        time.sleep(0.05)
+        self.assertEqual(stacks, sampler.stacks())
+        self.assertIn("busyWorker", [thread for thread, _ in stacks])
+        self.assertNotIn("allzparkSampler", [thread for thread, _ in stacks])
+
+        folded = sampler.folded().splitlines()
+        self.assertTrue(any(line.startswith("busyWorker;") and
+                            ";test_diagnostics:busy;" in line
+                            for line in folded))
+        self.assertEqual(sum(stacks.values()),
+                         sum(int(line.rsplit(" ", 1)[-1]) for line in folded))
+
+        speedscope = sampler.speedscope()
+        profiles = {p["name"]: p for p in speedscope["profiles"]}
+        frames = speedscope["shared"]["frames"]
+        self.assertIn("busyWorker", profiles)
+
+        profile = profiles["busyWorker"]
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        self.assertIn("test_diagnostics:busy",
+                      [frames[index]["name"]
+                       for sample in profile["samples"]
+                       for index in sample])
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        fname = sampler.export(os.path.join(root, "samples.json"))
+        with open(fname) as f:
+            self.assertEqual(speedscope["profiles"], json.load(f)["profiles"])
+
+        fname = sampler.export(os.path.join(root, "samples.txt"))
+        with open(fname) as f:
+            self.assertEqual(sampler.folded(), f.read())
+
+        sampler.clear()
+        self.assertEqual({}, sampler.stacks())
+
+    def test_sampler_bounded(self):
+        """Test unique stacks beyond the limit are counted as other"""
+        from allzpark import diagnostics
+
+        import threading
+
+        sampler = diagnostics.Sampler(rate=200, max_stacks=1)
+        self.addCleanup(sampler.stop)
+
+        stopped = threading.Event()
+        worker = threading.Thread(target=stopped.wait, name="idleWorker")
+        worker.start()
+
+        sampler.start()
+        time.sleep(0.2)
+        sampler.stop()
+
+        stopped.set()
+        worker.join()
+
+        stacks = sampler.stacks()
+        others = [frames for _, frames in stacks
+                  if frames == ((sampler.Other, 0, sampler.Other),)]
+
+        self.assertTrue(others)
+        self.assertEqual(1, len(stacks) - len(others))
+
+    def test_memory_profiler(self):
+        """Test allocations are compared between snapshots and exported"""
+        import os
+        import shutil
+        import tempfile
+        import tracemalloc
+        from allzpark import diagnostics
+
+        profiler = diagnostics.MemoryProfiler()
+        self.addCleanup(profiler.stop)
+
+        self.assertIsNone(profiler.snapshot())
+        self.assertIn("Memory profiling is off", profiler.report())
+
+        self.assertTrue(profiler.start())
+        self.assertTrue(profiler.is_running())
+        self.assertIn("No snapshot taken", profiler.report())
+
+        profiler.snapshot()
+        report = profiler.report()
+        self.assertIn("Top allocations", report)
+        self.assertNotIn("Growth since", report)
+
+        allocated = ["%08d" % index for index in range(10000)]
+        profiler.snapshot()
+        self.assertEqual(10000, len(allocated))
+
+        report = profiler.report(limit=5)
+        growth = report.split("Growth since previous", 1)[-1]
+        self.assertIn("Growth since baseline", growth)
+        self.assertIn("test_diagnostics.py", growth)
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        fname = profiler.export(os.path.join(root, "memory.txt"),
+                                sizes={"things": (3, 1024)})
+        with open(fname) as f:
+            exported = f.read()
+
+        self.assertIn("things", exported)
+        self.assertIn("Growth since previous", exported)
+
+        snapshot = tracemalloc.Snapshot.load(
+            os.path.join(root, "memory.tracemalloc"))
+        self.assertTrue(snapshot.traces)
+
+        profiler.stop()
+        self.assertFalse(profiler.is_running())
+        self.assertIn("Memory profiling is off", profiler.report())
+
+    def test_controller_sizes(self):
+        """Test caches and models of the controller are measured"""
+        from allzpark import diagnostics
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A", "~app_B"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+            "app_B": {"1": {"name": "app_B", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        with self.wait_signal(self.ctrl.application_changed):
+            self.select_application("app_A==1")
+
+        sizes = diagnostics.controller_sizes(self.ctrl)
+
+        self.assertEqual(2, sizes["rezContexts"][0])
+        self.assertEqual(1, sizes["rezEnvirons"][0])
+        self.assertGreater(sizes["rezEnvirons"][1], 0)
+        self.assertEqual(2, sizes["models.apps"][0])
+        self.assertGreater(sizes["resolveCache"][0], 0)
+        self.assertIsNone(sizes["resolveCache"][1])
+
+        report = diagnostics.MemoryProfiler().report(sizes)
+        for name in sizes:
+            self.assertIn(name, report)
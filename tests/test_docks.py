@@ -99,3 +99,276 @@ class TestDocks(util.TestBase):
 
                 self.wait(200)
                 menu.close()
+
+    def test_package_flags_follow_override(self):
+        """Test latest and beta columns update on override"""
+        from allzpark.vendor.Qt import QtCore
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1",
+                            "requires": ["bar"]}},
+            "bar": {"1": {"name": "bar", "version": "1"},
+                    "2": {"name": "bar", "version": "2"}}
+        })
+        self.ctrl_reset(["foo"])
+
+        self.set_preference("showAllVersions", True)
+        self.wait(200)  # wait for reset
+
+        self.select_application("app_A==1")
+
+        model = self.ctrl.models["packages"]
+        index = model.findIndex("bar")
+
+        def flags():
+            return tuple(model.data(model.index(index.row(), column),
+                                    QtCore.Qt.DisplayRole)
+                         for column in (3, 4))
+
+        self.assertEqual(("x", ""), flags())
+
+        changed = []
+        model.dataChanged.connect(lambda first, last, *args: changed.append(
+            (first.column(), last.column())))
+
+        model.setData(index, "1", "override")
+        self.assertEqual(("", ""), flags())
+        self.assertIn((0, 4), changed)
+
+        model.setData(index, "3.beta", "override")
+        self.assertEqual(("", "x"), flags())
+
+        model.setData(index, "2", "override")  # Back to default
+        self.assertEqual(("x", ""), flags())
+
+    def test_icon_cache(self):
+        """Test icons are decoded in the background, unless cleared"""
+        import os
+        import shutil
+        import tempfile
+        from allzpark import resources
+        from allzpark.vendor.Qt import QtGui
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+
+        path = os.path.join(root, "icon.png")
+        image = QtGui.QImage(4, 4, QtGui.QImage.Format_ARGB32)
+        image.fill(0)
+        image.save(path)
+
+        cache = resources.IconCache()
+        loaded = []
+        cache.loaded.connect(loaded.append)
+
+        placeholder = QtGui.QIcon(QtGui.QPixmap(2, 2))
+        self.assertIs(placeholder, cache.get(path, placeholder))
+
+        # Cleared whilst decoding
+        cache.clear()
+        self.wait(200)
+
+        self.assertEqual([], loaded)
+        self.assertIs(placeholder, cache.get(path, placeholder))
+
+        with self.wait_signal(cache.loaded):
+            pass
+
+        self.assertEqual([path], loaded)
+        icon = cache.get(path)
+        self.assertFalse(icon.isNull())
+        self.assertIs(icon, cache.get(path))
+
+    def test_environment_loaded_lazily(self):
+        """Test environment items are created as they are expanded"""
+        util.memory_repository({
+            "foo": {
+                "1": {"name": "foo", "version": "1",
+                      "requires": ["~app_A"],
+                      "commands": "env.MYPATH.append('/a')\n"
+                                  "env.MYPATH.append('/b')"},
+            },
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+        self.select_application("app_A==1")
+
+        model = self.ctrl.models["environment"]
+        keys = [model.index(row, 0).data()
+                for row in range(model.rowCount())]
+        index = model.index(keys.index("MYPATH"), 0)
+
+        # Children are created on expand only
+        self.assertTrue(model.hasChildren(index))
+        self.assertTrue(model.canFetchMore(index))
+        self.assertEqual(0, model.rowCount(index))
+
+        model.fetchMore(index)
+
+        self.assertFalse(model.canFetchMore(index))
+        self.assertEqual(
+            ["/a", "/b"],
+            [model.index(row, 1, index).data()
+             for row in range(model.rowCount(index))]
+        )
+
+    def test_graph_zoom_reuses_decoded_image(self):
+        """Test zooming into a large graph crops the image decoded once"""
+        import os
+        import shutil
+        import tempfile
+        from unittest import mock
+        from allzpark.vendor import QtImageViewer as viewer
+        from allzpark.vendor.Qt import QtCore, QtGui
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        fname = os.path.join(tempdir, "graph.png")
+        image = QtGui.QImage(400, 200, QtGui.QImage.Format_RGB32)
+        image.fill(QtCore.Qt.white)
+        image.save(fname)
+
+        widget = viewer.QtImageViewer()
+        self.addCleanup(widget.deleteLater)
+
+        with self.wait_signal(widget.imageFileLoaded):
+            self.assertTrue(widget.setImageFile(fname, maxPixels=100 * 50))
+
+        # Displayed downscaled, in full-resolution scene coordinates
+        self.assertEqual(100, widget.pixmap().width())
+        self.assertEqual(400, widget.sceneRect().width())
+
+        with mock.patch.object(viewer, "QImageReader") as reader:
+            for _ in range(3):
+                widget.zoomStack.append(QtCore.QRectF(0, 0, 40, 20))
+                widget.updateViewer()
+                widget.resizeEvent(None)
+
+        self.assertFalse(reader.called)
+        self.assertIsNotNone(widget._detailHandle)
+
+    def test_graph_cache_evicted(self):
+        """Test only the most recently used graphs are kept on disk"""
+        import os
+        import shutil
+        import tempfile
+        from allzpark import control
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        for index in range(5):
+            fname = os.path.join(tempdir, "%d.png" % index)
+            open(fname, "w").close()
+            os.utime(fname, (index, index))
+
+        removed = control.evict_cache(tempdir, 3)
+
+        self.assertEqual(["1.png", "0.png"], removed)
+        self.assertEqual(["2.png", "3.png", "4.png"],
+                         sorted(os.listdir(tempdir)))
+
+    def test_graph_failure(self):
+        """Test only GraphViz missing hides the generate button"""
+        import shutil
+        import tempfile
+        from unittest import mock
+        from allzpark import control
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+        self.select_application("app_A==1")
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        dock = self.show_dock("context")
+        generate = dock._widgets["generateGraph"]
+
+        with mock.patch.object(control, "cache_dir", return_value=tempdir), \
+                mock.patch.object(control.rez, "save_graph",
+                                  side_effect=RuntimeError("Corrupt")):
+            with self.wait_signal(self.ctrl.graph_failed):
+                dock.on_generate_clicked()
+
+        self.assertFalse(generate.isHidden())
+        self.assertTrue(generate.isEnabled())
+
+        with mock.patch.object(control, "cache_dir", return_value=tempdir), \
+                mock.patch.object(control.rez, "save_graph",
+                                  side_effect=OSError("dot not found")):
+            with self.wait_signal(self.ctrl.graph_rendered, ""):
+                dock.on_generate_clicked()
+
+        self.assertTrue(generate.isHidden())
+        self.assertIn("GraphViz not found",
+                      dock._widgets["graphHotkeys"].text())
+
+    def test_localize_all_through_localz(self):
+        """Test localising copies once, reporting progress during the copy"""
+        import os
+        import time
+        import shutil
+        import tempfile
+        from unittest import mock
+        from allzpark import control
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+        self.select_application("app_A==1")
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        def localize(variant, path, verbose):
+            root = os.path.join(path, variant.name, str(variant.version))
+            os.makedirs(root)
+
+            with open(os.path.join(root, "payload"), "wb") as f:
+                f.write(b"0" * 10 ** 6)
+
+            time.sleep(0.2)  # Still copying
+            return variant
+
+        def dirsize(path):
+            return sum(os.path.getsize(os.path.join(path, fname))
+                       for fname in os.listdir(path))
+
+        localz = mock.MagicMock()
+        localz.localize.side_effect = localize
+        localz.dirsize.side_effect = dirsize
+        localz.localized_packages_path.return_value = tempdir
+
+        progress = []
+        self.ctrl.localize_progressed.connect(
+            lambda *args: progress.append(args))
+
+        with mock.patch.object(control, "localz", localz), \
+                mock.patch.object(control, "LocalizeInterval", 0.02):
+            with self.wait_signal(self.ctrl.repository_changed):
+                self.ctrl.localize_all(["foo", "app_A"])
+
+        # Variants of the context, copied once
+        self.assertFalse(localz.resolve.called)
+        self.assertFalse(localz.prepare.called)
+        self.assertEqual(
+            ["app_A-1", "foo-1"],
+            sorted(call[0][0].qualified_package_name
+                   for call in localz.localize.call_args_list)
+        )
+
+        # Sizes reported before any package had been localised
+        self.assertTrue(any(done == 0 and size > 0
+                            for done, _, size in progress))
+        self.assertEqual((2, 2, 2.0), progress[-1])
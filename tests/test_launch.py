@@ -53,3 +53,134 @@ class TestLaunch(util.TestBase):
 
         self.assertIn("meow", "\n".join(stdout))
         self.assertEqual("", "\n".join(stderr))
+
+    def _launch(self, command):
+        stdout = list()
+        commands = self.ctrl.state["commands"]
+
+        with self.wait_signal(self.ctrl.state_changed, "launching"):
+            self.ctrl.launch(command=command,
+                             stdout=lambda m: stdout.append(m))
+
+        with self.wait_signal(commands[-1].killed):
+            pass
+
+        return "\n".join(stdout)
+
+    def _test_launch_environ(self):
+        util.memory_repository({
+            "foo": {
+                "1": {"name": "foo", "version": "1",
+                      "requires": ["~app"]},
+            },
+            "app": {
+                "1": {"name": "app", "version": "1",
+                      "commands": "env.APP_MEOW = 'meow'"},
+            },
+        })
+        self.ctrl_reset(["foo"])
+        self.select_application("app==1")
+
+        command = (
+            '%s -c "'
+            'import os,sys;'
+            'sys.stdout.write(os.environ[\'APP_MEOW\'] + \' \' + '
+            'os.environ[\'REZ_RXT_FILE\'])"'
+        ) % sys.executable
+
+        return self._launch(command).split(" ", 1)
+
+    def test_launch_from_shell_script(self):
+        """Test launching sources shell code written once per context"""
+        import os
+        import shutil
+        import tempfile
+        from unittest import mock
+        from allzpark import control
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        def cache_dir(*paths):
+            path = os.path.join(tempdir, *paths)
+            if not os.path.exists(path):
+                os.makedirs(path)
+            return path
+
+        with mock.patch.object(control, "cache_dir", cache_dir):
+            value, rxt_file = self._test_launch_environ()
+
+        self.assertEqual("meow", value)
+
+        context = self.ctrl.state["rezContexts"]["app==1"]
+        environ = self.ctrl.parent_environ()
+        script = self.ctrl.shell_script(context, environ)
+
+        self.assertEqual(script, self.ctrl.shell_script(context, environ))
+
+        # Context saved alongside, and no temporary files left behind
+        root = os.path.dirname(script)
+        self.assertTrue(root.startswith(tempdir))
+        self.assertEqual(os.path.join(root, "context.rxt"), rxt_file)
+        self.assertEqual(
+            sorted(["context.rxt", os.path.basename(script)]),
+            sorted(os.listdir(root))
+        )
+
+    def test_shell_scripts_evicted(self):
+        """Test only shell code of recently used contexts is kept"""
+        import os
+        import shutil
+        import tempfile
+        from unittest import mock
+        from allzpark import control
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app"]}},
+            "app": {"1": {"name": "app", "version": "1"}},
+        })
+        self.ctrl_reset(["foo"])
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        def cache_dir(*paths):
+            path = os.path.join(tempdir, *paths)
+            if not os.path.exists(path):
+                os.makedirs(path)
+            return path
+
+        for index in range(3):
+            os.utime(cache_dir("shells", "stale%d" % index), (index, index))
+
+        context = self.ctrl.state["rezContexts"]["app==1"]
+        environ = self.ctrl.parent_environ()
+
+        with mock.patch.object(control, "cache_dir", cache_dir), \
+                mock.patch.object(control, "MaxCachedShells", 2):
+            script = self.ctrl.shell_script(context, environ)
+
+            self.assertEqual(
+                sorted(["stale2", os.path.basename(os.path.dirname(script))]),
+                sorted(os.listdir(os.path.join(tempdir, "shells")))
+            )
+
+            # Evicted by e.g. another instance, and written anew
+            shutil.rmtree(os.path.dirname(script))
+            self.assertEqual(script, self.ctrl.shell_script(context, environ))
+            self.assertTrue(os.path.exists(script))
+
+    def test_launch_without_spawn_shell(self):
+        """Test launching via the context where shells cannot be spawned"""
+        from unittest import mock
+        from allzpark import _rezapi
+
+        with mock.patch.object(_rezapi, "can_spawn_shell",
+                               return_value=False):
+            value, _ = self._test_launch_environ()
+
+            context = self.ctrl.state["rezContexts"]["app==1"]
+            self.assertIsNone(self.ctrl.shell_script(context))
+
+        self.assertEqual("meow", value)
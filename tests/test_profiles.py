@@ -140,3 +140,158 @@ class TestProfiles(util.TestBase):
         expected = ["foo", "bar"]
         profiles = self.ctrl.list_profiles(expected + [None, ""])
         self.assertEqual(profiles, expected)
+
+    def test_reset_from_snapshot(self):
+        """Test profiles replayed from a captured repository"""
+        import os
+        import tempfile
+        from allzpark import snapshot
+
+        util.memory_repository({
+            "foo": {
+                "1.0.0": {
+                    "name": "foo",
+                    "version": "1.0.0",
+                    "requires": ["~app_A"],
+                    "_data": {"label": "Foo"},
+                }
+            },
+            "app_A": {
+                "1.0.0": {
+                    "name": "app_A",
+                    "version": "1.0.0",
+                    "commands": "env.THIS_A='1'",
+                }
+            },
+        })
+
+        fname = os.path.join(tempfile.mkdtemp(), "snapshot.json.gz")
+        snapshot.capture(fname, paths=[util.MEMORY_LOCATION])
+
+        util.memory_repository({})
+        util.snapshot_repository(fname, latency=0.01)
+        self.ctrl_reset(["foo"])
+
+        self.assertEqual(["foo"], list(self.ctrl.state["rezProfiles"]))
+        self.assertIn("app_A==1.0.0", self.ctrl.state["rezApps"])
+
+    def test_favorites_prewarmed_whilst_idle(self):
+        """Test favorite profiles are resolved once the user is idle"""
+        import time
+        from allzpark.vendor.Qt import QtCore, QtGui, QtWidgets
+
+        packages = {}
+        for name in ("foo", "baz", "bar"):
+            app = "app_%s" % name
+            packages[name] = {"1": {"name": name, "version": "1",
+                                    "requires": ["~" + app]}}
+            packages[app] = {"1": {"name": app, "version": "1"}}
+
+        util.memory_repository(packages)
+        self.ctrl.state.store("favoriteProfiles", "foo")
+        self.ctrl._prewarmer._idle = 0.3
+
+        def prewarmed():
+            return sorted(set(
+                key[0][0] for key in self.ctrl.state["resolveCache"]
+                if key[0] and key[0][0] != "bar-1"
+            ))
+
+        def press():
+            event = QtGui.QKeyEvent(QtCore.QEvent.KeyPress,
+                                    QtCore.Qt.Key_Shift,
+                                    QtCore.Qt.NoModifier)
+            QtWidgets.QApplication.sendEvent(self.window, event)
+
+        self.ctrl_reset(["foo", "baz", "bar"])
+        self.assertEqual("bar", self.ctrl.state["profileName"])
+
+        # Busy
+        end = time.time() + 1.0
+        while time.time() < end:
+            press()
+            self.wait(100)
+
+        self.assertEqual([], prewarmed())
+
+        # Idle
+        end = time.time() + 3.0
+        while not prewarmed() and time.time() < end:
+            self.wait(100)
+
+        self.assertEqual(["foo-1"], prewarmed())
+
+    def test_profile_prefetched_on_dwell(self):
+        """Test pointing or arrowing at a profile prefetches it, until left"""
+        import time
+        import threading
+        from allzpark.vendor.Qt import QtCore, QtGui, QtWidgets
+
+        util.memory_repository({
+            "foo": {"1": {"name": "foo", "version": "1",
+                          "requires": ["~app_A"]}},
+            "bar": {"1": {"name": "bar", "version": "1",
+                          "requires": ["~app_A"]}},
+            "app_A": {"1": {"name": "app_A", "version": "1"}},
+        })
+        self.ctrl_reset(["foo", "bar"])
+
+        # Show all profiles, not only the current and favorites
+        profiles = self.window._docks["profiles"]
+        profiles._widgets["filtering"].click()
+
+        view = profiles._widgets["view"]
+        view.expandAll()
+        proxy = view.model()
+        index = {
+            name: proxy.mapFromSource(proxy.sourceModel().findIndex(name))
+            for name in ("foo", "bar")
+        }
+
+        prefetched = []
+        cancelled = threading.Event()
+
+        def prewarm(profile, wait):
+            prefetched.append(profile.name)
+            while wait():
+                time.sleep(0.01)
+            cancelled.set()
+
+        def leave():
+            QtWidgets.QApplication.sendEvent(
+                view, QtCore.QEvent(QtCore.QEvent.Leave))
+
+        with mock.patch.object(self.ctrl, "prewarm", prewarm):
+
+            # Passing over a profile is not enough
+            view.entered.emit(index["foo"])
+            self.wait(50)
+            self.assertEqual([], prefetched)
+
+            # Dwelling on it is
+            self.wait(view.HoverDwell + 100)
+            self.assertEqual(["foo"], prefetched)
+            self.assertFalse(cancelled.is_set())
+
+            leave()
+            self.assertTrue(cancelled.wait(1))
+
+            # Arrowing onto a profile prefetches it right away, sorted
+            # by name such that bar comes before foo
+            cancelled.clear()
+            view.setCurrentIndex(index["bar"])
+            self.wait(50)
+            self.assertEqual(["foo", "bar"], prefetched)
+
+            QtWidgets.QApplication.sendEvent(view, QtGui.QKeyEvent(
+                QtCore.QEvent.KeyPress,
+                QtCore.Qt.Key_Down,
+                QtCore.Qt.NoModifier))
+            self.wait(50)
+
+            self.assertEqual(["foo", "bar", "foo"], prefetched)
+            self.assertTrue(cancelled.wait(1))  # Of bar, once arrowed off
+            cancelled.clear()
+
+            leave()
+            self.assertTrue(cancelled.wait(1))
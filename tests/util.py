@@ -1,5 +1,6 @@
 
 import os
+import gc
 import time
 import unittest
 import contextlib
@@ -10,7 +11,7 @@ MEMORY_LOCATION = "memory@any"
 
 def memory_repository(packages):
     from rezplugins.package_repository import memory
-    from allzpark import _rezapi as rez
+    from allzpark import _rezapi as rez, snapshot
 
     class MemoryVariantRes(memory.MemoryVariantResource):
         def _root(self):  # implement `root` to work with localz
@@ -20,6 +21,33 @@ def memory_repository(packages):
     repository = manager.get_repository(MEMORY_LOCATION)
     repository.pool.resource_classes[MemoryVariantRes.key] = MemoryVariantRes
     repository.data = packages
+    repository.clear_caches()  # of packages from previous tests
+    snapshot.simulate_latency(repository, 0)
+
+    return repository
+
+
+def snapshot_repository(fname, latency=None):
+    """Replay snapshot captured with `python -m allzpark.snapshot`
+
+    Arguments:
+        fname (str): Path to snapshot
+        latency (float, optional): Seconds per listing of a family,
+            defaults to what was captured
+
+    """
+
+    from allzpark import snapshot
+
+    data = snapshot.load(fname)
+    repository = memory_repository(data["packages"])
+
+    if latency is None:
+        latency = snapshot.latency_of(data)
+
+    snapshot.simulate_latency(repository, latency)
+
+    return repository
 
 
 class TestBase(unittest.TestCase):
@@ -51,6 +79,10 @@ class TestBase(unittest.TestCase):
         self._restore_allzparkconfig()
         time.sleep(0.1)
 
+        # Collect Qt objects of this test here, on the GUI thread,
+        # rather than in a thread of the next
+        gc.collect()
+
     def _restore_allzparkconfig(self):
         from allzpark import allzparkconfig
 
@@ -99,6 +131,16 @@ class TestBase(unittest.TestCase):
             self.ctrl.reset(profiles)
         self.wait(timeout=200)
         self.assertEqual(self.ctrl.state.state, "ready")
+        self.wait_resolved()
+
+    def wait_resolved(self, timeout=2000):
+        """Wait for apps resolved in the background, once listed"""
+        if self.ctrl.state.retrieve("resolveOnDemand"):
+            return
+
+        end = time.time() + timeout / 1000.0
+        while self.ctrl.state["unresolvedApps"] and time.time() < end:
+            self.wait(20)
 
     def select_application(self, app_request):
         apps = self.window._widgets["apps"]